@@ -0,0 +1,162 @@
+"""
+Capital allocation across concurrent arbitrage opportunities
+
+background.js commits a fixed stake to each arb as it is seen until the
+payroll is used up, so early low-ROI arbs can starve later better ones.
+allocate() instead looks at every live opportunity at once and splits the
+free capital to maximize guaranteed profit subject to:
+
+- each opportunity's depth-limited max investment (indicative, mid-priced
+  opportunities have no depth and quotes older than max_age are stale;
+  both are dropped before solving)
+- the payroll left after already blocked funds
+- the balance available on each venue (a leg's stake is spent on its venue)
+- a maximum number of trades
+- at most one position per market (the opportunity types of one market
+  compete for the same Polymarket depth)
+
+Profit is linear in the amount invested (roi * x), so without a trade limit
+filling the highest-ROI opportunities first is optimal for the payroll
+constraint and a close approximation with per-venue balances. With a trade
+limit each slot goes to the opportunity adding the most profit given the
+capital still free. Both are O(trades * opportunities).
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Venue each leg of an opportunity is placed on, by opportunity type (see price_matrix.evaluate_rows)
+LEG_VENUES = {
+    "poly_both": ("polymarket", "polymarket"),
+    "poly_a_venue_b": ("polymarket", "venue"),
+    "venue_a_poly_b": ("venue", "polymarket")
+}
+
+
+class _Candidate:
+    __slots__ = ("opportunity", "rate", "cap", "shares")
+
+    def __init__(self, opportunity: Dict, cap: float):
+        odds1, odds2 = opportunity["odds"]
+        ip1, ip2 = 1 / odds1, 1 / odds2
+        margin = ip1 + ip2
+
+        self.opportunity = opportunity
+        self.rate = opportunity["roi"] / 100
+        self.cap = cap
+        # Fraction of the investment spent on each venue
+        self.shares: Dict[str, float] = {}
+        for venue, ip in zip(LEG_VENUES[opportunity["type"]], (ip1, ip2)):
+            self.shares[venue] = self.shares.get(venue, 0.0) + ip / margin
+
+    def fill(self, free: float, balances: Dict[str, float]) -> float:
+        """Largest investment that fits the cap, free payroll and venue balances"""
+        amount = min(self.cap, free)
+        for venue, share in self.shares.items():
+            if venue in balances:
+                amount = min(amount, balances[venue] / share)
+        return max(0.0, amount)
+
+
+def allocate(opportunities: List[Dict], payroll: float, blocked: float = 0.0,
+             max_trades: int = 0, balances: Optional[Dict[str, float]] = None,
+             min_stake: float = 1.0, max_stake: Optional[float] = None,
+             now: Optional[float] = None, max_age: Optional[float] = None) -> Dict:
+    """
+    Choose investments for a set of opportunities as returned by
+    ArbWorkerPool.evaluate(). `balances` maps venue ("polymarket", "venue")
+    to the capital available there; venues left out are unconstrained.
+    `max_trades` of 0 means no limit. Opportunities whose oldest quote
+    (`updated_at`) is more than `max_age` seconds before `now` are skipped.
+    """
+    start = time.perf_counter()
+    free = max(0.0, payroll - blocked)
+    balances = dict(balances or {})
+    if now is None:
+        now = time.time()
+    skipped_indicative = 0
+    skipped_stale = 0
+
+    # Best opportunity per market only
+    best: Dict[str, Dict] = {}
+    for opportunity in opportunities:
+        if opportunity["roi"] <= 0:
+            continue
+        if opportunity.get("indicative") or opportunity.get("max_investment") is None:
+            # Priced from a mid: no depth to size against
+            skipped_indicative += 1
+            continue
+        if max_age is not None and now - opportunity.get("updated_at", 0.0) > max_age:
+            skipped_stale += 1
+            continue
+        current = best.get(opportunity["market_id"])
+        if current is None or opportunity["roi"] > current["roi"]:
+            best[opportunity["market_id"]] = opportunity
+
+    candidates = []
+    for opportunity in best.values():
+        cap = opportunity["max_investment"]
+        if max_stake is not None:
+            cap = min(cap, max_stake)
+        if cap >= min_stake:
+            candidates.append(_Candidate(opportunity, cap))
+
+    chosen: List[Tuple[_Candidate, float]] = []
+
+    def take(candidate: _Candidate, amount: float):
+        nonlocal free
+        chosen.append((candidate, amount))
+        free -= amount
+        for venue, share in candidate.shares.items():
+            if venue in balances:
+                balances[venue] -= amount * share
+
+    if 0 < max_trades < len(candidates):
+        # Each slot goes to the largest profit achievable with what is still free
+        while len(chosen) < max_trades and candidates and free >= min_stake:
+            index, amount = max(
+                ((i, c.fill(free, balances)) for i, c in enumerate(candidates)),
+                key=lambda item: candidates[item[0]].rate * item[1]
+            )
+            if amount < min_stake:
+                break
+            take(candidates.pop(index), amount)
+    else:
+        candidates.sort(key=lambda c: c.rate, reverse=True)
+        for candidate in candidates:
+            if free < min_stake:
+                break
+            amount = candidate.fill(free, balances)
+            if amount >= min_stake:
+                take(candidate, amount)
+
+    allocations = []
+    for candidate, amount in chosen:
+        opportunity = candidate.opportunity
+        odds1, odds2 = opportunity["odds"]
+        ip1, ip2 = 1 / odds1, 1 / odds2
+        stake1 = amount * ip1 / (ip1 + ip2)
+        stake2 = amount - stake1
+        allocations.append({
+            "market_id": opportunity["market_id"],
+            "type": opportunity["type"],
+            "odds": opportunity["odds"],
+            "roi": opportunity["roi"],
+            "investment": round(amount, 2),
+            "stake1": round(stake1, 2),
+            "stake2": round(stake2, 2),
+            "expected_profit": round(amount * candidate.rate, 2)
+        })
+
+    invested = sum(amount for _, amount in chosen)
+    return {
+        "allocations": allocations,
+        "invested": round(invested, 2),
+        "expected_profit": round(sum(a["expected_profit"] for a in allocations), 2),
+        "free_after": round(free, 2),
+        "balances_after": {venue: round(value, 2) for venue, value in balances.items()},
+        "candidates": len(best),
+        "skipped_indicative": skipped_indicative,
+        "skipped_stale": skipped_stale,
+        "solve_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
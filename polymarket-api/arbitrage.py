@@ -0,0 +1,55 @@
+"""
+Arbitrage math, ported from ArbitrageCalculator in arbitrageLogic.js
+"""
+
+from typing import Dict, Optional
+
+
+def calculate(odds1: float, odds2: float) -> Dict:
+    """Arbitrage between two decimal odds on complementary outcomes"""
+    if not odds1 or not odds2:
+        return {"is_arb": False, "profit": 0.0, "roi": 0.0}
+
+    total_ip = 1 / odds1 + 1 / odds2
+    roi = ((1 / total_ip) - 1) * 100
+
+    return {
+        "is_arb": roi > 0,
+        "profit": roi,
+        "roi": round(roi, 2)
+    }
+
+
+def calculate_stakes(total_investment: float, odds1: float, odds2: float) -> Optional[Dict]:
+    """Split an investment across both legs so either outcome returns the same"""
+    if not total_investment or not odds1 or not odds2:
+        return None
+
+    ip1 = 1 / odds1
+    ip2 = 1 / odds2
+    market_margin = ip1 + ip2
+
+    stake1 = (total_investment * ip1) / market_margin
+    stake2 = (total_investment * ip2) / market_margin
+
+    total_return = stake1 * odds1
+    profit = total_return - total_investment
+
+    return {
+        "stake1": round(stake1, 2),
+        "stake2": round(stake2, 2),
+        "total_return": round(total_return, 2),
+        "profit": round(profit, 2),
+        "roi": round(profit / total_investment * 100, 2)
+    }
+
+
+def max_investment(odds1: float, odds2: float, max_stake1: float, max_stake2: float) -> float:
+    """
+    Largest total investment whose per-leg stakes fit within the available
+    depth on each side (stake_i = total * ip_i / margin).
+    """
+    ip1 = 1 / odds1
+    ip2 = 1 / odds2
+    margin = ip1 + ip2
+    return min(max_stake1 * margin / ip1, max_stake2 * margin / ip2)
@@ -0,0 +1,400 @@
+"""
+Replay recorded odds through the arbitrage logic faster than real time
+
+Ticks (see tick_log.py) are streamed through a generator pipeline: per-token
+quote rows are updated in place, only the market a tick touches is
+re-evaluated, and market state is dropped when the market resolves, so
+memory follows the number of live markets rather than the number of ticks.
+Book and venue ticks for tokens no poller tick has tied to a live market
+(never seen, or already resolved) are counted as unmatched_ticks and
+dropped rather than given a row nothing would free.
+
+Trading mirrors the extension's auto-trade simulation in background.js:
+a fixed stake per opportunity, blocked funds capped by a max payroll, and an
+optional max number of trades. Fills are capped by the recorded best-ask
+depth and consume it. As on the server, quotes older than --max-quote-age
+are ignored. An opportunity with a Polymarket leg that only has a mid (no
+recorded ask) is indicative: it is counted as skipped_mid_only and never
+traded. The report covers P&L, capital lockup and how long opportunities
+stayed open.
+
+    python backtest.py ticks.ndjson [more.ndjson ...] --stake 100 --max-payroll 1000
+    python backtest.py --synthetic-markets 500 --synthetic-hours 24
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import config
+from price_matrix import (
+    ASK, ASK_SIZE, BID, BOOK_AT, MID, MID_AT, NUM_FIELDS, VENUE_AT, VENUE_ODDS, evaluate_rows
+)
+from tick_log import read_ticks
+
+NAN = float("nan")
+
+# Which outcome tokens (0 = first, 1 = second) are bought on Polymarket per opportunity type
+POLY_LEGS = {
+    "poly_both": (0, 1),
+    "poly_a_venue_b": (0,),
+    "venue_a_poly_b": (1,)
+}
+
+
+class Reservoir:
+    """Fixed-size uniform sample for percentiles over an unbounded stream"""
+
+    def __init__(self, size: int = 10000, seed: int = 1):
+        self.size = size
+        self.samples: List[float] = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rng = random.Random(seed)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            i = self.rng.randrange(self.count)
+            if i < self.size:
+                self.samples[i] = value
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "max": self.max
+        }
+
+
+class Position:
+    __slots__ = ("market_id", "kind", "opened_at", "investment", "payout")
+
+    def __init__(self, market_id: str, kind: str, opened_at: float, investment: float, payout: float):
+        self.market_id = market_id
+        self.kind = kind
+        self.opened_at = opened_at
+        self.investment = investment
+        self.payout = payout
+
+
+class PortfolioSim:
+    """Stake / payroll / max-trades bookkeeping as in background.js auto-trade"""
+
+    def __init__(self, stake: float, max_payroll: float, max_trades: int = 0, min_fill: float = 1.0):
+        self.stake = stake
+        self.max_payroll = max_payroll
+        self.max_trades = max_trades
+        self.min_fill = min_fill
+
+        self.blocked_funds = 0.0
+        self.peak_blocked = 0.0
+        self.trade_count = 0
+        self.invested = 0.0
+        self.realized_profit = 0.0
+        self.skipped_payroll = 0
+        self.skipped_max_trades = 0
+        self.skipped_depth = 0
+        self.skipped_mid_only = 0
+        self.positions: Dict[str, List[Position]] = {}
+        self.lockup = Reservoir()
+
+    def try_open(self, opportunity: Dict, ts: float) -> Optional[Position]:
+        stakes = opportunity["stakes"]
+        if not stakes:
+            return None
+        investment = stakes["stake1"] + stakes["stake2"]
+
+        if investment < self.min_fill:
+            self.skipped_depth += 1
+            return None
+        if self.max_trades and self.trade_count >= self.max_trades:
+            self.skipped_max_trades += 1
+            return None
+        if self.blocked_funds + investment > self.max_payroll:
+            self.skipped_payroll += 1
+            return None
+
+        position = Position(opportunity["market_id"], opportunity["type"], ts, investment, stakes["total_return"])
+        self.positions.setdefault(position.market_id, []).append(position)
+        self.trade_count += 1
+        self.invested += investment
+        self.blocked_funds += investment
+        self.peak_blocked = max(self.peak_blocked, self.blocked_funds)
+        return position
+
+    def settle(self, market_id: str, ts: float):
+        for position in self.positions.pop(market_id, []):
+            self.realized_profit += position.payout - position.investment
+            self.blocked_funds -= position.investment
+            self.lockup.add(ts - position.opened_at)
+
+    def open_summary(self) -> Dict[str, float]:
+        open_positions = [p for positions in self.positions.values() for p in positions]
+        return {
+            "open_positions": len(open_positions),
+            "open_investment": round(sum(p.investment for p in open_positions), 2),
+            "open_expected_profit": round(sum(p.payout - p.investment for p in open_positions), 2)
+        }
+
+
+class ReplayEngine:
+    def __init__(self, sim: PortfolioSim, min_roi: float = 0.0, max_quote_age: Optional[float] = None):
+        self.sim = sim
+        self.min_roi = min_roi
+        self.max_quote_age = max_quote_age
+
+        self.rows: Dict[str, List[float]] = {}
+        self.token_market: Dict[str, str] = {}
+        self.market_tokens: Dict[str, List[str]] = {}
+        # Late ticks for these must not bring a settled market back
+        self.resolved: Set[str] = set()
+        # (market_id, type) -> timestamp the opportunity appeared
+        self.open_opportunities: Dict[Tuple[str, str], float] = {}
+        self.durations = Reservoir()
+
+        self.ticks = 0
+        self.evaluations = 0
+        self.unmatched_ticks = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+    def _row(self, token_id: str) -> List[float]:
+        row = self.rows.get(token_id)
+        if row is None:
+            row = self.rows[token_id] = [NAN] * NUM_FIELDS
+        return row
+
+    def _register(self, market_id: str, token_id: str):
+        if token_id in self.token_market or market_id in self.resolved:
+            return
+        self.token_market[token_id] = market_id
+        self.market_tokens.setdefault(market_id, []).append(token_id)
+
+    def process(self, tick: Dict):
+        ts = tick["ts"]
+        self.ticks += 1
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+
+        source = tick["source"]
+
+        if source == "resolved":
+            self._resolve(tick["market_id"], ts)
+            return
+
+        token_id = tick["token_id"]
+        if source == "poly" or (source == "venue" and tick.get("market_id")):
+            self._register(tick["market_id"], token_id)
+        market_id = self.token_market.get(token_id)
+        if market_id is None:
+            self.unmatched_ticks += 1
+            return
+        row = self._row(token_id)
+
+        if source == "poly":
+            row[MID] = tick["mid"]
+            row[MID_AT] = ts
+        elif source == "book":
+            for field, key in ((BID, "bid"), (ASK, "ask"), (ASK_SIZE, "ask_size")):
+                value = tick.get(key)
+                row[field] = NAN if value is None else value
+            row[BOOK_AT] = ts
+        elif source == "venue":
+            row[VENUE_ODDS] = tick["venue_odds"]
+            row[VENUE_AT] = ts
+
+        self._evaluate(market_id, ts)
+
+    def _evaluate(self, market_id: str, ts: float):
+        tokens = self.market_tokens[market_id]
+        if len(tokens) != 2:
+            return
+
+        self.evaluations += 1
+        opportunities = evaluate_rows(
+            market_id, self.rows[tokens[0]], self.rows[tokens[1]], self.sim.stake, ts, self.max_quote_age
+        )
+        active = set()
+
+        for opportunity in opportunities:
+            if opportunity["roi"] < self.min_roi:
+                continue
+            key = (market_id, opportunity["type"])
+            active.add(key)
+            if key in self.open_opportunities:
+                continue
+
+            # New opportunity: trade it once, like the extension does
+            self.open_opportunities[key] = ts
+            if opportunity["indicative"]:
+                # Priced from a mid with no recorded ask depth: not executable
+                self.sim.skipped_mid_only += 1
+                continue
+            position = self.sim.try_open(opportunity, ts)
+            if position:
+                self._consume_depth(tokens, opportunity)
+
+        for kind in POLY_LEGS:
+            key = (market_id, kind)
+            if key not in active and key in self.open_opportunities:
+                self.durations.add(ts - self.open_opportunities.pop(key))
+
+    def _consume_depth(self, tokens: List[str], opportunity: Dict):
+        """Remove the shares just bought from the recorded best-ask size"""
+        stakes = opportunity["stakes"]
+        leg_stakes = (stakes["stake1"], stakes["stake2"])
+        for leg in POLY_LEGS[opportunity["type"]]:
+            row = self.rows[tokens[leg]]
+            if math.isnan(row[ASK_SIZE]):
+                continue
+            price = 1 / opportunity["odds"][leg]
+            row[ASK_SIZE] = max(0.0, row[ASK_SIZE] - leg_stakes[leg] / price)
+
+    def _resolve(self, market_id: str, ts: float):
+        for kind in POLY_LEGS:
+            started = self.open_opportunities.pop((market_id, kind), None)
+            if started is not None:
+                self.durations.add(ts - started)
+
+        self.sim.settle(market_id, ts)
+        self.resolved.add(market_id)
+
+        for token_id in self.market_tokens.pop(market_id, []):
+            self.rows.pop(token_id, None)
+            self.token_market.pop(token_id, None)
+
+    def run(self, ticks: Iterable[Dict]) -> Dict:
+        start = time.perf_counter()
+        for tick in ticks:
+            self.process(tick)
+        elapsed = time.perf_counter() - start
+
+        replayed = (self.last_ts - self.first_ts) if self.ticks else 0.0
+        sim = self.sim
+
+        return {
+            "ticks": self.ticks,
+            "evaluations": self.evaluations,
+            "unmatched_ticks": self.unmatched_ticks,
+            "elapsed_s": round(elapsed, 3),
+            "ticks_per_s": round(self.ticks / elapsed) if elapsed else 0,
+            "replayed_hours": round(replayed / 3600, 2),
+            "speedup": round(replayed / elapsed) if elapsed else 0,
+            "trades": sim.trade_count,
+            "invested": round(sim.invested, 2),
+            "realized_profit": round(sim.realized_profit, 2),
+            **sim.open_summary(),
+            "peak_blocked_funds": round(sim.peak_blocked, 2),
+            "skipped_payroll": sim.skipped_payroll,
+            "skipped_max_trades": sim.skipped_max_trades,
+            "skipped_depth": sim.skipped_depth,
+            "skipped_mid_only": sim.skipped_mid_only,
+            "lockup_s": sim.lockup.summary(),
+            "opportunity_duration_s": self.durations.summary(),
+            "live_markets_at_end": len(self.market_tokens)
+        }
+
+
+def synthetic_ticks(markets: int, hours: float, interval: float = 30.0,
+                    venue_every: int = 10, seed: int = 1) -> Iterator[Dict]:
+    """
+    Generate a time-ordered day of ticks: mids on every interval, a top of
+    book and venue odds every `venue_every` intervals, markets resolving at
+    staggered times through the day.
+    """
+    rng = random.Random(seed)
+    start = 1_760_000_000.0
+    end = start + hours * 3600
+    steps = int(hours * 3600 / interval)
+
+    state = []
+    for m in range(markets):
+        mid = rng.uniform(0.2, 0.8)
+        state.append({
+            "market_id": str(700000 + m),
+            "tokens": (f"{m}a", f"{m}b"),
+            "mid": mid,
+            "resolves_at": rng.uniform(start + 3600, end),
+            "resolved": False
+        })
+
+    for step in range(steps):
+        ts = start + step * interval
+        for market in state:
+            if market["resolved"]:
+                continue
+            if ts >= market["resolves_at"]:
+                market["resolved"] = True
+                winner = market["tokens"][0] if market["mid"] > 0.5 else market["tokens"][1]
+                yield {"ts": ts, "source": "resolved", "market_id": market["market_id"], "winner": winner}
+                continue
+
+            mid = min(0.98, max(0.02, market["mid"] + rng.gauss(0, 0.01)))
+            market["mid"] = mid
+            token_a, token_b = market["tokens"]
+            # The two mids drift apart a little, occasionally summing below 1
+            mid_b = min(0.98, max(0.02, 1 - mid + rng.gauss(0, 0.01)))
+            yield {"ts": ts, "source": "poly", "market_id": market["market_id"], "token_id": token_a, "mid": mid}
+            yield {"ts": ts, "source": "poly", "market_id": market["market_id"], "token_id": token_b, "mid": mid_b}
+
+            if step % venue_every == 0:
+                yield {"ts": ts, "source": "book", "token_id": token_a,
+                       "ask": round(mid + 0.01, 3), "ask_size": rng.uniform(50, 2000), "bid": round(mid - 0.01, 3)}
+                yield {"ts": ts, "source": "venue", "token_id": token_b,
+                       "venue_odds": round(1 / (1 - mid) * rng.uniform(0.93, 1.04), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded odds through the arbitrage logic")
+    parser.add_argument("paths", nargs="*", help="Tick logs (NDJSON) recorded via TICK_LOG_PATH")
+    parser.add_argument("--stake", type=float, default=100.0)
+    parser.add_argument("--max-payroll", type=float, default=1000.0)
+    parser.add_argument("--max-trades", type=int, default=0)
+    parser.add_argument("--min-roi", type=float, default=0.0, help="Minimum ROI %% to count/trade")
+    parser.add_argument("--max-quote-age", type=float, default=config.ARB_MAX_QUOTE_AGE,
+                        help="Ignore quotes older than this many seconds (0 = no limit)")
+    parser.add_argument("--synthetic-markets", type=int, default=500)
+    parser.add_argument("--synthetic-hours", type=float, default=24.0)
+    parser.add_argument("--synthetic-interval", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.paths:
+        ticks = read_ticks(args.paths)
+    else:
+        ticks = synthetic_ticks(args.synthetic_markets, args.synthetic_hours, args.synthetic_interval)
+
+    engine = ReplayEngine(
+        PortfolioSim(args.stake, args.max_payroll, args.max_trades),
+        args.min_roi,
+        args.max_quote_age or None
+    )
+    report = engine.run(ticks)
+
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(f"{key}:")
+            for sub_key, sub_value in value.items():
+                print(f"  {sub_key:<10} {sub_value:>14.2f}")
+        else:
+            print(f"{key:<24} {value:>14}")
+
+
+if __name__ == "__main__":
+    main()
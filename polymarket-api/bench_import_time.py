@@ -0,0 +1,111 @@
+"""
+Import-time budget check
+
+Imports each module in a fresh interpreter under `python -X importtime` and
+fails if its cumulative import time is over budget, or if it pulled in a
+module that must only load lazily (the CLOB client and its web3/eth
+signing stack, loaded on the first orderbook call or by the WARM_CLOB
+startup warm-up).
+
+Budgets are per module. fastapi alone takes 0.5-0.9 s to import depending
+on the machine, so main gets 1500 ms; the lazy-import check is what catches
+the multi-second web3 stack. Modules without a default budget use
+--budget-ms; --budget overrides one module.
+
+    python bench_import_time.py                          # main and polymarket_client
+    python bench_import_time.py --budget main=1200 --budget polymarket_client=300
+    python bench_import_time.py --budget-ms 50 config models
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LAZY_PREFIXES = ("py_clob_client", "web3", "eth_account", "eth_abi", "eth_utils", "eth_keys")
+
+# ms; measured at ~0.7-1.2 s for main (fastapi ~0.5-0.9 s of it) and ~0.2-0.4 s for the client
+DEFAULT_BUDGETS = {"main": 1500.0, "polymarket_client": 600.0}
+
+
+def parse_budgets(values: List[str]) -> Dict[str, float]:
+    budgets = {}
+    for value in values:
+        module, _, ms = value.partition("=")
+        if not module or not ms:
+            raise argparse.ArgumentTypeError(f"Expected module=ms, got {value!r}")
+        budgets[module] = float(ms)
+    return budgets
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """Cumulative import time in ms, its slowest direct imports, and lazy modules that loaded"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0.0
+    children: List[Tuple[str, float]] = []
+    pending: List[Tuple[str, float]] = []
+    loaded = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting depth is shown by two spaces of indentation per level;
+        # a module's imports are listed before the module itself
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        ms = int(cumulative) / 1000
+        if name.startswith(LAZY_PREFIXES):
+            loaded.append(name)
+        if depth == 1:
+            pending.append((name, ms))
+        elif depth == 0:
+            if name == module:
+                total, children = ms, pending
+            pending = []
+
+    slowest = sorted(children, key=lambda item: item[1], reverse=True)[:8]
+    return total, slowest, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("modules", nargs="*", default=["main", "polymarket_client"])
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="Budget for modules without their own")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="Per-module budget (repeatable); overrides the defaults")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs (first run warms .pyc files)")
+    args = parser.parse_args()
+    try:
+        budgets = {**DEFAULT_BUDGETS, **parse_budgets(args.budget)}
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    failed = False
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        total, slowest, loaded = min(runs, key=lambda run: run[0])
+
+        budget = budgets.get(module, args.budget_ms)
+        status = "ok" if total <= budget and not loaded else "FAIL"
+        print(f"{module:<24} {total:>8.1f} ms  (budget {budget:.0f} ms)  {status}")
+        for name, ms in slowest:
+            print(f"    {name:<36} {ms:>8.1f} ms")
+        if loaded:
+            print(f"    loaded eagerly: {', '.join(sorted(set(loaded))[:8])}")
+
+        failed = failed or status == "FAIL"
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Memory benchmark: raw Gamma market dicts vs the slotted Market model
+
+Generates synthetic Gamma-shaped markets and reports retained bytes per
+market for both representations at 10k and 100k markets.
+
+    python bench_market_memory.py [count ...]
+"""
+
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from typing import Callable, Dict, List
+
+import models
+from models import DescriptionStore, Market
+
+TEAMS = [
+    "Lakers", "Celtics", "Warriors", "Bulls", "Heat", "Knicks", "Nuggets",
+    "Liverpool", "Arsenal", "Chelsea", "Real Madrid", "Barcelona", "Bayern",
+    "Chiefs", "Eagles", "Cowboys", "Packers", "Ravens", "Bills", "49ers"
+]
+TAGS = ["Sports", "NBA", "NFL", "Soccer", "EPL", "Games", "La Liga"]
+DESCRIPTION = (
+    "This market will resolve to \"Yes\" if the {home} win their game against "
+    "the {away} scheduled for {date}. If the game is postponed beyond the end "
+    "date, this market will resolve 50-50. Resolution source is the official "
+    "league website and statistics. " * 3
+)
+
+
+def make_market(i: int, rng: random.Random) -> str:
+    home, away = rng.sample(TEAMS, 2)
+    date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return json.dumps({
+        "id": str(500000 + i),
+        "condition_id": f"0x{rng.getrandbits(256):064x}",
+        "question": f"Will the {home} beat the {away} on {date}?",
+        "description": DESCRIPTION.format(home=home, away=away, date=date),
+        "tokens": [
+            {"token_id": str(rng.getrandbits(250)), "outcome": "Yes", "price": rng.random()},
+            {"token_id": str(rng.getrandbits(250)), "outcome": "No", "price": rng.random()}
+        ],
+        "volume": f"{rng.uniform(0, 1e6):.2f}",
+        "liquidity": f"{rng.uniform(0, 1e5):.2f}",
+        "end_date_iso": f"{date}T00:00:00Z",
+        "tags": rng.sample(TAGS, 3),
+        "image": f"https://polymarket-upload.s3.amazonaws.com/{home.lower()}.png",
+        "active": True,
+        "closed": False
+    })
+
+
+def measure(count: int, build: Callable[[List[str]], object]) -> float:
+    rng = random.Random(count)
+    payloads = [make_market(i, rng) for i in range(count)]
+
+    # Parsing happens under the tracer so every retained string is counted,
+    # as it would be when markets arrive in HTTP responses
+    gc.collect()
+    tracemalloc.start()
+    result = build(payloads)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del result
+    return retained / count
+
+
+def build_raw(payloads: List[str]) -> List[Dict]:
+    return [json.loads(p) for p in payloads]
+
+
+def build_model(payloads: List[str]) -> List[Market]:
+    models.description_store = DescriptionStore()
+    return [Market.from_gamma(json.loads(p)) for p in payloads]
+
+
+def main():
+    counts = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+
+    print(f"{'markets':>10} {'raw dict B/mkt':>16} {'Market B/mkt':>14} {'ratio':>7}")
+    for count in counts:
+        raw_bytes = measure(count, build_raw)
+        model_bytes = measure(count, build_model)
+        print(f"{count:>10} {raw_bytes:>16.0f} {model_bytes:>14.0f} {raw_bytes / model_bytes:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Offline benchmark suite
+
+Starts the local upstream stand-in (upstream_stub.py), points the service at
+it and measures:
+
+    client.*       sports page fetch time, batch price fan-out
+    poller.*       LiveOddsPoller poll-cycle time
+    upstream_ws.*  market-channel WS message rate and callback latency
+    app.*          FastAPI requests/sec and latency, price-to-client latency on /ws
+    process.*      peak RSS (stand-in and service share the process)
+
+    python bench_suite.py [--markets 200] [--latency 0.02] [--jitter 0.01]
+    python bench_suite.py --save-baseline     # write bench_baseline.json
+    python bench_suite.py --compare           # fail on regressions vs the baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import sys
+import time
+from typing import Dict, List
+
+from config import config
+from upstream_stub import UpstreamStub, load_dataset
+
+BASELINE_PATH = "bench_baseline.json"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def bench_client(markets: int) -> Dict[str, float]:
+    from polymarket_client import PolymarketClient
+
+    client = PolymarketClient()
+    results = {}
+    try:
+        page_times = []
+        market_ids = []
+        cursor = 0
+        while len(market_ids) < markets:
+            start = time.perf_counter()
+            page = await client.get_sports_markets(limit=20, offset=cursor)
+            page_times.append(time.perf_counter() - start)
+            if not page["markets"]:
+                break
+            market_ids.extend(m.id for m in page["markets"])
+            cursor = page["next_offset"]
+        market_ids = market_ids[:markets]
+        results["client.sports_page_ms"] = 1000 * sum(page_times) / len(page_times)
+
+        # Cold batches are noisy; the median of a few keeps --compare meaningful
+        timings = []
+        for _ in range(3):
+            client.market_cache.clear()
+            client.token_index.clear()
+            client.price_cache.clear()
+            start = time.perf_counter()
+            batch = await client.get_batch_prices(market_ids, [])
+            timings.append(time.perf_counter() - start)
+        elapsed = percentile(timings, 50)
+        results["client.batch_prices_ms"] = 1000 * elapsed
+        results["client.batch_tokens_per_s"] = batch["count"] / elapsed if elapsed else 0.0
+    finally:
+        await client.close()
+
+    return results
+
+
+async def bench_poller(markets: int, cycles: int) -> Dict[str, float]:
+    from polymarket_client import PolymarketClient
+    from websocket_handler import LiveOddsPoller
+
+    client = PolymarketClient()
+    poller = LiveOddsPoller(client)
+    updates = 0
+
+    async def on_update(data):
+        nonlocal updates
+        updates += 1
+
+    poller.on_update(on_update)
+
+    try:
+        page_offset = 0
+        while len(poller.tracked_markets) < markets:
+            page = await client.get_sports_markets(limit=50, offset=page_offset)
+            if not page["markets"]:
+                break
+            for market in page["markets"]:
+                if len(poller.tracked_markets) < markets:
+                    poller.track_market(market.id, market)
+            page_offset = page["next_offset"]
+
+        durations = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await poller.poll_once()
+            durations.append(time.perf_counter() - start)
+    finally:
+        await client.close()
+
+    return {
+        "poller.cycle_ms_p50": 1000 * percentile(durations, 50),
+        "poller.cycle_ms_max": 1000 * max(durations),
+        "poller.updates_per_s": updates / sum(durations) if durations else 0.0
+    }
+
+
+async def bench_upstream_ws(stub: UpstreamStub, tokens: int, duration: float) -> Dict[str, float]:
+    from websocket_handler import PolymarketWebSocket
+
+    feed = PolymarketWebSocket()
+    latencies = []
+
+    async def on_price(data):
+        latencies.append(time.time() - float(data.get("timestamp", time.time())))
+
+    feed.on_price_update(on_price)
+    await feed.connect()
+    for token_id in list(stub.midpoints)[:tokens]:
+        await feed.subscribe_to_market(token_id)
+
+    listener = asyncio.create_task(feed.listen())
+    await asyncio.sleep(duration)
+    listener.cancel()
+    await feed.disconnect()
+
+    return {
+        "upstream_ws.msgs_per_s": len(latencies) / duration,
+        "upstream_ws.latency_ms_p50": 1000 * percentile(latencies, 50),
+        "upstream_ws.latency_ms_p99": 1000 * percentile(latencies, 99)
+    }
+
+
+async def bench_app(stub: UpstreamStub, markets: int, duration: float,
+                    concurrency: int, poll_interval: float) -> Dict[str, float]:
+    import httpx
+    import uvicorn
+    import websockets
+    import main
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    market_ids = list(stub.markets)[:markets]
+    token_ids = list(stub.midpoints)[:markets]
+    results = {}
+
+    try:
+        # HTTP throughput over a mix of endpoints
+        latencies = []
+        deadline = time.perf_counter() + duration
+
+        async def worker(n: int):
+            async with httpx.AsyncClient(base_url=base, timeout=30.0) as http:
+                i = n
+                while time.perf_counter() < deadline:
+                    i += 1
+                    start = time.perf_counter()
+                    kind = i % 4
+                    if kind == 0:
+                        await http.get("/api/markets/sports", params={"limit": 20, "cursor": 20 * (i % 5)})
+                    elif kind == 1:
+                        await http.get(f"/api/markets/{market_ids[i % len(market_ids)]}")
+                    elif kind == 2:
+                        await http.get(f"/api/orderbook/{token_ids[i % len(token_ids)]}")
+                    else:
+                        await http.post("/api/prices/batch", json={"market_ids": market_ids[:50]})
+                    latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        results["app.requests_per_s"] = len(latencies) / duration
+        results["app.request_ms_p50"] = 1000 * percentile(latencies, 50)
+        results["app.request_ms_p99"] = 1000 * percentile(latencies, 99)
+
+        # Price-to-client latency: midpoint served by the stand-in -> price_update on /ws
+        main.odds_poller.poll_interval = poll_interval
+        broadcast_latencies = []
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws") as ws:
+            for market_id in market_ids:
+                await ws.send(json.dumps({"type": "subscribe", "market_id": market_id}))
+
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=deadline - time.perf_counter())
+                except asyncio.TimeoutError:
+                    break
+                message = json.loads(raw)
+                if message.get("type") != "price_update":
+                    continue
+                received = time.time()
+                for price in message["data"]["prices"].values():
+                    served = stub.served_at.get(price.get("token_id"))
+                    if served:
+                        broadcast_latencies.append(received - served)
+
+        results["ws.price_to_client_ms_p50"] = 1000 * percentile(broadcast_latencies, 50)
+        results["ws.price_to_client_ms_p95"] = 1000 * percentile(broadcast_latencies, 95)
+        results["ws.price_to_client_ms_p99"] = 1000 * percentile(broadcast_latencies, 99)
+        results["ws.updates_per_s"] = len(broadcast_latencies) / duration
+    finally:
+        server.should_exit = True
+        await server_task
+
+    return results
+
+
+async def run_suite(args) -> Dict[str, float]:
+    stub = UpstreamStub(load_dataset(args.fixture, args.events), args.latency, args.jitter, args.ws_interval)
+    base_url = await stub.start()
+
+    # Point the service at the stand-in before any service module is imported
+    config.GAMMA_API_URL = base_url
+    config.POLYMARKET_HOST = base_url
+    config.WS_URL = stub.ws_url
+    # Measure upstream cost, not cache hits
+    config.PRICE_CACHE_TTL = 0
+    config.ALERT_JOURNAL_PATH = ""
+
+    results: Dict[str, float] = {}
+    try:
+        results.update(await bench_client(args.markets))
+        results.update(await bench_poller(args.markets, args.cycles))
+        results.update(await bench_upstream_ws(stub, args.markets, args.duration))
+        results.update(await bench_app(stub, args.markets, args.duration, args.concurrency, args.poll_interval))
+    finally:
+        await stub.stop()
+
+    results["process.peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results["stub.requests"] = stub.request_count
+    return results
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith("_per_s")
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"\n{'metric':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, value in results.items():
+        if name not in baseline or name.startswith("stub."):
+            continue
+        base = baseline[name]
+        change = (value - base) / base if base else 0.0
+        worse = -change if higher_is_better(name) else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{name:<32} {base:>12.2f} {value:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--fixture", help="Recorded dataset (upstream_stub.py record); generated if omitted")
+    parser.add_argument("--events", type=int, default=150)
+    parser.add_argument("--markets", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--ws-interval", type=float, default=0.25)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression fraction")
+    args = parser.parse_args()
+
+    # The service reads static/ and .env relative to its own directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    results = asyncio.run(run_suite(args))
+
+    for name, value in results.items():
+        print(f"{name:<32} {value:>12.2f}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare", "tolerance")}
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"params": params, "results": results}, f, indent=2)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+
+    if args.compare:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print("\nWarning: baseline was recorded with different parameters")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
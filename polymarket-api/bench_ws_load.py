@@ -0,0 +1,262 @@
+"""
+/ws load test
+
+Starts the upstream stand-in in this process and the API server as a
+subprocess pointed at it, then ramps up thousands of websocket clients that
+replay a subscribe / unsubscribe / ping mix. Reports connection setup rate,
+price-update delivery latency, ping round-trips, dropped clients and server
+CPU / RSS per connection (read from /proc, so server stats need Linux).
+
+    python bench_ws_load.py --clients 2000 --ramp-rate 200 --duration 30
+    python bench_ws_load.py --server-url ws://127.0.0.1:8000/ws   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from bench_suite import free_port, percentile
+from upstream_stub import UpstreamStub, load_dataset
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoadStats:
+    def __init__(self):
+        self.connect_times: List[float] = []
+        self.connect_failures = 0
+        self.dropped = 0
+        self.delivery_latencies: List[float] = []
+        self.pong_rtts: List[float] = []
+        self.messages = 0
+        self.sent = {"subscribe": 0, "unsubscribe": 0, "ping": 0}
+
+
+class ServerProcess:
+    """API server subprocess with /proc based CPU and memory sampling"""
+
+    def __init__(self, port: int, stub: UpstreamStub, poll_interval: float):
+        env = dict(os.environ)
+        env.update({
+            "GAMMA_API_URL": stub.base_url,
+            "POLYMARKET_HOST": stub.base_url,
+            "WS_URL": stub.ws_url,
+            "ALERT_JOURNAL_PATH": "",
+            "POLL_INTERVAL": str(poll_interval)
+        })
+        self.port = port
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=HERE, env=env
+        )
+
+    async def wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as http:
+            while time.monotonic() < deadline:
+                try:
+                    resp = await http.get(f"http://127.0.0.1:{self.port}/api/ready")
+                    if resp.status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("API server did not become ready")
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.proc.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            # utime and stime are fields 14 and 15 of /proc/pid/stat
+            return (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+async def run_client(url: str, market_ids: List[str], stats: LoadStats,
+                     stop_at: float, think_time: float, rng: random.Random):
+    start = time.perf_counter()
+    try:
+        ws = await websockets.connect(url, open_timeout=30, max_queue=None)
+    except Exception:
+        stats.connect_failures += 1
+        return
+    stats.connect_times.append(time.perf_counter() - start)
+
+    pings: Dict[int, float] = {}
+    subscribed: List[str] = []
+
+    async def reader():
+        async for raw in ws:
+            stats.messages += 1
+            message = json.loads(raw)
+            kind = message.get("type")
+            if kind == "price_update":
+                # The server stamps updates with its loop clock (CLOCK_MONOTONIC),
+                # which is shared by every process on the host
+                stats.delivery_latencies.append(time.monotonic() - message["data"]["timestamp"])
+            elif kind == "pong" and pings:
+                sent = pings.pop(min(pings))
+                stats.pong_rtts.append(time.perf_counter() - sent)
+
+    read_task = asyncio.create_task(reader())
+    seq = 0
+    try:
+        while time.monotonic() < stop_at and not read_task.done():
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+            roll = rng.random()
+            if roll < 0.4 or not subscribed:
+                market_id = rng.choice(market_ids)
+                subscribed.append(market_id)
+                await ws.send(json.dumps({"type": "subscribe", "market_id": market_id}))
+                stats.sent["subscribe"] += 1
+            elif roll < 0.6:
+                market_id = subscribed.pop(rng.randrange(len(subscribed)))
+                await ws.send(json.dumps({"type": "unsubscribe", "market_id": market_id}))
+                stats.sent["unsubscribe"] += 1
+            else:
+                seq += 1
+                pings[seq] = time.perf_counter()
+                await ws.send(json.dumps({"type": "ping"}))
+                stats.sent["ping"] += 1
+
+        if read_task.done():
+            stats.dropped += 1
+    except websockets.exceptions.ConnectionClosed:
+        stats.dropped += 1
+    finally:
+        read_task.cancel()
+        await ws.close()
+
+
+async def run_load(args) -> Dict[str, float]:
+    # Thousands of sockets need a higher descriptor limit than the usual 1024
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    stub = UpstreamStub(load_dataset(args.fixture, args.events), args.latency, args.jitter)
+    await stub.start()
+    market_ids = list(stub.markets)
+
+    server = None
+    url = args.server_url
+    if not url:
+        port = free_port()
+        server = ServerProcess(port, stub, args.poll_interval)
+        await server.wait_ready()
+        url = f"ws://127.0.0.1:{port}/ws"
+
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    results: Dict[str, float] = {}
+
+    try:
+        rss_before = server.rss_mb() if server else None
+        cpu_before = server.cpu_seconds() if server else None
+        test_start = time.monotonic()
+        stop_at = test_start + args.duration
+
+        tasks = []
+        for i in range(args.clients):
+            tasks.append(asyncio.create_task(
+                run_client(url, market_ids, stats, stop_at, args.think_time, random.Random(rng.random()))
+            ))
+            await asyncio.sleep(1 / args.ramp_rate)
+        ramp_elapsed = time.monotonic() - test_start
+
+        # Sample the server with every client connected
+        await asyncio.sleep(max(0.0, stop_at - time.monotonic() - 1))
+        rss_loaded = server.rss_mb() if server else None
+        connected = len(stats.connect_times)
+
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - test_start
+        cpu_after = server.cpu_seconds() if server else None
+
+        results["clients"] = args.clients
+        results["connected"] = connected
+        results["connect_failures"] = stats.connect_failures
+        results["dropped"] = stats.dropped
+        results["connect_rate_per_s"] = connected / ramp_elapsed if ramp_elapsed else 0.0
+        results["connect_ms_p50"] = 1000 * percentile(stats.connect_times, 50)
+        results["connect_ms_p99"] = 1000 * percentile(stats.connect_times, 99)
+        results["messages_received"] = stats.messages
+        results["delivery_ms_p50"] = 1000 * percentile(stats.delivery_latencies, 50)
+        results["delivery_ms_p95"] = 1000 * percentile(stats.delivery_latencies, 95)
+        results["delivery_ms_p99"] = 1000 * percentile(stats.delivery_latencies, 99)
+        results["pong_ms_p50"] = 1000 * percentile(stats.pong_rtts, 50)
+        results["pong_ms_p99"] = 1000 * percentile(stats.pong_rtts, 99)
+        for kind, count in stats.sent.items():
+            results[f"sent_{kind}"] = count
+
+        if cpu_before is not None and cpu_after is not None:
+            results["server_cpu_pct"] = 100 * (cpu_after - cpu_before) / elapsed
+            if connected:
+                results["server_cpu_ms_per_conn_s"] = 1000 * (cpu_after - cpu_before) / (connected * elapsed)
+        if rss_before is not None and rss_loaded is not None and connected:
+            results["server_rss_mb"] = rss_loaded
+            results["server_rss_kb_per_conn"] = 1024 * (rss_loaded - rss_before) / connected
+    finally:
+        if server:
+            server.stop()
+        await stub.stop()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/ws load test")
+    parser.add_argument("--server-url", help="Target an already running server instead of spawning one")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--ramp-rate", type=float, default=200, help="New connections per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between client messages")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--fixture")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:<28} {value:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
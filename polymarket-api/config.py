@@ -1,7 +1,22 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _load_dotenv():
+    """Load the nearest .env (this directory or a parent); python-dotenv is only imported if one exists"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return
+        directory = parent
+
+
+_load_dotenv()
 
 class Config:
     # Polymarket API
@@ -12,8 +27,71 @@ class Config:
     # WebSocket
     WS_URL = os.getenv("WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market")
     
+    # Seconds between LiveOddsPoller cycles
+    POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "5"))
+    
+    # How often batched binary frames are flushed to /ws clients (seconds)
+    WS_FLUSH_INTERVAL = float(os.getenv("WS_FLUSH_INTERVAL", "0.1"))
+    
+    # Per-connection /ws request workers and how many requests may wait for them
+    WS_CLIENT_WORKERS = int(os.getenv("WS_CLIENT_WORKERS", "4"))
+    WS_CLIENT_QUEUE = int(os.getenv("WS_CLIENT_QUEUE", "64"))
+    
     # Gamma API (for market data)
-    GAMMA_API_URL = "https://gamma-api.polymarket.com"
+    GAMMA_API_URL = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
+    
+    # Client-side caching and upstream fan-out
+    MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", "60"))
+    PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "2"))
+    MARKET_CACHE_SIZE = int(os.getenv("MARKET_CACHE_SIZE", "5000"))
+    PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", "20000"))
+    MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+    MAX_BATCH_IDS = int(os.getenv("MAX_BATCH_IDS", "5000"))
+    
+    # Serialized HTTP response cache (TTLs in seconds)
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    CATALOG_RESPONSE_TTL = float(os.getenv("CATALOG_RESPONSE_TTL", "10"))
+    MARKET_RESPONSE_TTL = float(os.getenv("MARKET_RESPONSE_TTL", "2"))
+    ORDERBOOK_RESPONSE_TTL = float(os.getenv("ORDERBOOK_RESPONSE_TTL", "1"))
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    
+    # Shared-memory price matrix and arbitrage worker processes (0 = evaluate on the loop)
+    PRICE_MATRIX_SLOTS = int(os.getenv("PRICE_MATRIX_SLOTS", "20000"))
+    ARB_WORKERS = int(os.getenv("ARB_WORKERS", "2"))
+    # Quotes older than this (seconds) are left out of arbitrage evaluation
+    ARB_MAX_QUOTE_AGE = float(os.getenv("ARB_MAX_QUOTE_AGE", "30"))
+    
+    # Load the CLOB client (web3 signing stack) at startup instead of on the first order book
+    WARM_CLOB = os.getenv("WARM_CLOB", "").lower() in ("1", "true", "yes")
+    
+    # Market lifecycle: sweep interval, Gamma re-check age for live markets,
+    # how long a market may settle before it is archived anyway (seconds)
+    LIFECYCLE_INTERVAL = float(os.getenv("LIFECYCLE_INTERVAL", "60"))
+    LIFECYCLE_REFRESH = float(os.getenv("LIFECYCLE_REFRESH", "900"))
+    LIFECYCLE_SETTLE_TIMEOUT = float(os.getenv("LIFECYCLE_SETTLE_TIMEOUT", "86400"))
+    LIFECYCLE_MAX_ARCHIVED = int(os.getenv("LIFECYCLE_MAX_ARCHIVED", "10000"))
+    
+    # Append every observed price to this NDJSON file for backtest.py (empty = off)
+    TICK_LOG_PATH = os.getenv("TICK_LOG_PATH", "")
+    
+    # Admin endpoints (/api/admin/*) require this token in X-Admin-Token; empty disables them
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    
+    # Event-loop lag sampling and the stall duration that gets a stack trace logged (seconds)
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+    SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.1"))
+    
+    # Local SQLite cache used by explorer.py
+    EXPLORER_CACHE_PATH = os.getenv("EXPLORER_CACHE_PATH", "explorer.db")
+    
+    # Telegram alert pipeline (stub sink when no bot token is set)
+    TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+    TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+    ALERT_JOURNAL_PATH = os.getenv("ALERT_JOURNAL_PATH", "alerts.db")
+    ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", "60"))
+    ALERT_RATE_PER_CHAT = float(os.getenv("ALERT_RATE_PER_CHAT", "1"))
+    ALERT_BURST = float(os.getenv("ALERT_BURST", "3"))
+    ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "5"))
     
     # Sports keywords for filtering
     SPORTS_KEYWORDS = [
@@ -0,0 +1,2 @@
+# test_clob.py is a manual script against the live CLOB, not a pytest module
+collect_ignore = ["test_clob.py"]
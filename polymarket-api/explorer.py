@@ -0,0 +1,378 @@
+"""
+Tag / event / market explorer over a local SQLite cache
+
+Replaces the one-off find_tags.py, get_tag_ids.py, debug_tags.py,
+inspect_events.py and test_slug.py scripts. `refresh` pages Gamma /tags and
+/events concurrently through PolymarketClient into an indexed SQLite file;
+every other command is answered from that file without touching the API.
+
+Refreshes are incremental: events are requested most recently updated
+first and paging stops at the first page with nothing newer than the last
+completed sync. Unchanged events are not rewritten. Without
+--include-closed, an incremental refresh also pages recently updated closed
+events to close the cached ones, and a complete refresh marks cached events
+it no longer sees as open closed.
+
+    python explorer.py refresh [--full] [--include-closed]
+    python explorer.py tags --sports
+    python explorer.py tags --search nba
+    python explorer.py events --slug lakers-vs-celtics-2026-01-05
+    python explorer.py events --tag nba
+    python explorer.py markets --token <token_id>
+    python explorer.py markets --event <event slug>
+    python explorer.py stats
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+# Tag labels/slugs that mark a sport (from the old get_tag_ids.py)
+SPORTS_TAG_KEYWORDS = ["sports", "nba", "nfl", "nhl", "soccer", "football", "ufc", "basketball", "cricket", "tennis"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (id TEXT PRIMARY KEY, label TEXT, slug TEXT COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tags_slug ON tags (slug);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY, slug TEXT, title TEXT, active INTEGER, closed INTEGER,
+    end_date TEXT, updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS events_slug ON events (slug);
+CREATE TABLE IF NOT EXISTS event_tags (
+    event_id TEXT, tag_id TEXT, tag_slug TEXT COLLATE NOCASE, PRIMARY KEY (event_id, tag_slug)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS event_tags_slug ON event_tags (tag_slug);
+CREATE TABLE IF NOT EXISTS markets (
+    id TEXT PRIMARY KEY, event_id TEXT, question TEXT, active INTEGER, closed INTEGER
+);
+CREATE INDEX IF NOT EXISTS markets_event ON markets (event_id);
+CREATE TABLE IF NOT EXISTS market_tokens (token_id TEXT PRIMARY KEY, market_id TEXT, outcome TEXT);
+CREATE INDEX IF NOT EXISTS market_tokens_market ON market_tokens (market_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _market_tokens(market: Dict) -> List[Tuple[str, str]]:
+    """(token_id, outcome) pairs from either `tokens` or the clobTokenIds/outcomes JSON strings"""
+    if market.get("tokens"):
+        return [(str(t["token_id"]), t.get("outcome", "")) for t in market["tokens"] if t.get("token_id")]
+
+    try:
+        token_ids = json.loads(market.get("clobTokenIds") or "[]")
+        outcomes = json.loads(market.get("outcomes") or "[]")
+    except (TypeError, ValueError):
+        return []
+    return [(str(token_id), outcomes[i] if i < len(outcomes) else "") for i, token_id in enumerate(token_ids)]
+
+
+class ExplorerCache:
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def put_tags(self, tags: List[Dict]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO tags (id, label, slug) VALUES (?, ?, ?)",
+            [(str(t["id"]), t.get("label"), t.get("slug")) for t in tags if t.get("id") is not None]
+        )
+
+    def put_event(self, event: Dict) -> bool:
+        """Insert or replace an event with its tags, markets and tokens; False if unchanged or without an id"""
+        if event.get("id") is None:
+            return False
+        event_id = str(event["id"])
+        updated_at = event.get("updatedAt")
+        if updated_at:
+            row = self.db.execute("SELECT updated_at FROM events WHERE id = ?", (event_id,)).fetchone()
+            if row and row[0] == updated_at:
+                return False
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO events (id, slug, title, active, closed, end_date, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (event_id, event.get("slug"), event.get("title"), int(bool(event.get("active", True))),
+             int(bool(event.get("closed", False))), event.get("endDate"), updated_at)
+        )
+
+        self.db.execute("DELETE FROM event_tags WHERE event_id = ?", (event_id,))
+        tags = [t for t in event.get("tags") or [] if isinstance(t, dict)]
+        self.put_tags(tags)
+        self.db.executemany(
+            "INSERT OR IGNORE INTO event_tags (event_id, tag_id, tag_slug) VALUES (?, ?, ?)",
+            [(event_id, str(t.get("id")), t.get("slug")) for t in tags if t.get("slug")]
+        )
+
+        old_markets = [r[0] for r in self.db.execute("SELECT id FROM markets WHERE event_id = ?", (event_id,))]
+        self.db.executemany("DELETE FROM market_tokens WHERE market_id = ?", [(m,) for m in old_markets])
+        self.db.execute("DELETE FROM markets WHERE event_id = ?", (event_id,))
+
+        for market in event.get("markets", []):
+            market_id = str(market.get("id") or market.get("conditionId") or "")
+            if not market_id:
+                continue
+            self.db.execute(
+                "INSERT OR REPLACE INTO markets (id, event_id, question, active, closed) VALUES (?, ?, ?, ?, ?)",
+                (market_id, event_id, market.get("question"), int(bool(market.get("active", True))),
+                 int(bool(market.get("closed", False))))
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO market_tokens (token_id, market_id, outcome) VALUES (?, ?, ?)",
+                [(token_id, market_id, outcome) for token_id, outcome in _market_tokens(market)]
+            )
+        return True
+
+    def has_event(self, event_id) -> bool:
+        return self.db.execute("SELECT 1 FROM events WHERE id = ?", (str(event_id),)).fetchone() is not None
+
+    def close_missing_events(self, open_ids: set) -> int:
+        """Mark cached open events that are not in `open_ids` closed; returns how many"""
+        stale = [(r[0],) for r in self.db.execute("SELECT id FROM events WHERE closed = 0") if r[0] not in open_ids]
+        self.db.executemany("UPDATE events SET closed = 1, active = 0 WHERE id = ?", stale)
+        self.db.executemany("UPDATE markets SET closed = 1, active = 0 WHERE event_id = ?", stale)
+        return len(stale)
+
+    def commit(self):
+        self.db.commit()
+
+    # Queries
+
+    def sports_tags(self) -> List[Tuple]:
+        """Tags matching a sports keyword, plus tags that co-occur with `sports` on an event"""
+        keyword_clause = " OR ".join(["slug = ? OR label LIKE ?"] * len(SPORTS_TAG_KEYWORDS))
+        keyword_args = [arg for k in SPORTS_TAG_KEYWORDS for arg in (k, f"%{k}%")]
+        return self.db.execute(
+            f"SELECT id, label, slug FROM tags WHERE {keyword_clause} "
+            "UNION SELECT t.id, t.label, t.slug FROM tags t JOIN event_tags et ON et.tag_id = t.id "
+            "WHERE et.event_id IN (SELECT event_id FROM event_tags WHERE tag_slug = 'sports') "
+            "ORDER BY slug",
+            keyword_args
+        ).fetchall()
+
+    def search_tags(self, text: str) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT id, label, slug FROM tags WHERE label LIKE ? OR slug LIKE ? ORDER BY slug",
+            (f"%{text}%", f"%{text}%")
+        ).fetchall()
+
+    def events_by_slug(self, slug: str) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT id, slug, title, closed, end_date FROM events WHERE slug = ?", (slug,)
+        ).fetchall()
+
+    def events_by_tag(self, tag_slug: str, limit: int) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT e.id, e.slug, e.title, e.closed, e.end_date FROM event_tags et "
+            "JOIN events e ON e.id = et.event_id WHERE et.tag_slug = ? ORDER BY e.end_date LIMIT ?",
+            (tag_slug, limit)
+        ).fetchall()
+
+    def search_events(self, text: str, limit: int) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT id, slug, title, closed, end_date FROM events WHERE title LIKE ? OR slug LIKE ? LIMIT ?",
+            (f"%{text}%", f"%{text}%", limit)
+        ).fetchall()
+
+    def markets_by_token(self, token_id: str) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT m.id, e.slug, m.question, mt.outcome FROM market_tokens mt "
+            "JOIN markets m ON m.id = mt.market_id LEFT JOIN events e ON e.id = m.event_id "
+            "WHERE mt.token_id = ?",
+            (token_id,)
+        ).fetchall()
+
+    def markets_by_event(self, slug: str) -> List[Tuple]:
+        return self.db.execute(
+            "SELECT m.id, e.slug, m.question, group_concat(mt.outcome || '=' || mt.token_id, ' ') "
+            "FROM events e JOIN markets m ON m.event_id = e.id "
+            "LEFT JOIN market_tokens mt ON mt.market_id = m.id WHERE e.slug = ? GROUP BY m.id",
+            (slug,)
+        ).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        for table in ("tags", "events", "markets", "market_tokens"):
+            counts[table] = self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+
+    def close(self):
+        self.db.close()
+
+
+async def paginate(fetch: Callable, page_size: int, concurrency: int,
+                   stop: Callable[[List[Dict]], bool] = lambda page: False) -> AsyncIterator[List[Dict]]:
+    """
+    Fetch pages `concurrency` at a time. Ends after a short page or when
+    `stop` says a page is already known; raises if a page fails.
+    """
+    offset = 0
+    while True:
+        offsets = [offset + i * page_size for i in range(concurrency)]
+        pages = await asyncio.gather(*(fetch(page_size, o) for o in offsets))
+        for page in pages:
+            if page is None:
+                raise RuntimeError("Page request failed, sync aborted")
+            yield page
+            if len(page) < page_size or stop(page):
+                return
+        offset += concurrency * page_size
+
+
+async def refresh(cache: ExplorerCache, full: bool, include_closed: bool,
+                  page_size: int, concurrency: int) -> Dict[str, int]:
+    from polymarket_client import polymarket_client
+
+    result = {"tags": 0, "events_seen": 0, "events_written": 0, "events_closed": 0, "pages": 0}
+    try:
+        # Tags: the endpoint ignores offset on some deployments, so stop once a page brings nothing new
+        seen_tags = set()
+
+        def no_new_tags(page: List[Dict]) -> bool:
+            ids = {str(t.get("id")) for t in page}
+            new = ids - seen_tags
+            seen_tags.update(ids)
+            return not new
+
+        async for page in paginate(polymarket_client.get_tags_page, page_size, concurrency, no_new_tags):
+            cache.put_tags(page)
+            result["pages"] += 1
+        result["tags"] = len(seen_tags)
+
+        scope = "all" if include_closed else "open"
+        watermark = None if full else cache.get_meta(f"events_watermark:{scope}")
+        newest = watermark
+
+        params = {"order": "updatedAt", "ascending": "false"}
+        if not include_closed:
+            params.update({"active": "true", "closed": "false"})
+
+        def fetch_events(limit: int, offset: int):
+            return polymarket_client.get_events_page(limit, offset, **params)
+
+        def already_synced(page: List[Dict]) -> bool:
+            return bool(watermark) and all(e.get("updatedAt") and e["updatedAt"] <= watermark for e in page)
+
+        seen_ids = set()
+        async for page in paginate(fetch_events, page_size, concurrency, already_synced):
+            result["pages"] += 1
+            for event in page:
+                result["events_seen"] += 1
+                if event.get("id") is not None:
+                    seen_ids.add(str(event["id"]))
+                if cache.put_event(event):
+                    result["events_written"] += 1
+                updated_at = event.get("updatedAt")
+                if updated_at and (newest is None or updated_at > newest):
+                    newest = updated_at
+            cache.commit()
+
+        if not include_closed:
+            if watermark:
+                # Events closed since the last sync drop out of the open listing; page them separately
+                closed_params = {"order": "updatedAt", "ascending": "false", "closed": "true"}
+
+                def fetch_closed(limit: int, offset: int):
+                    return polymarket_client.get_events_page(limit, offset, **closed_params)
+
+                async for page in paginate(fetch_closed, page_size, concurrency, already_synced):
+                    result["pages"] += 1
+                    for event in page:
+                        if event.get("id") is not None and cache.has_event(event["id"]) and cache.put_event(event):
+                            result["events_closed"] += 1
+                    cache.commit()
+            else:
+                # A complete open sync saw every open event; anything else cached as open has closed
+                result["events_closed"] = cache.close_missing_events(seen_ids)
+
+        # Only a completed sync moves the watermark
+        if newest:
+            cache.set_meta(f"events_watermark:{scope}", newest)
+        cache.commit()
+    finally:
+        await polymarket_client.close()
+
+    return result
+
+
+def _print_rows(rows: List[Tuple], started: float):
+    for row in rows:
+        print("  ".join("" if value is None else str(value) for value in row))
+    print(f"({len(rows)} rows, {(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explore Gamma tags, events and markets from a local cache")
+    parser.add_argument("--db", default=config.EXPLORER_CACHE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = commands.add_parser("refresh", help="Sync tags and events into the cache")
+    refresh_parser.add_argument("--full", action="store_true", help="Ignore the watermark and page everything")
+    refresh_parser.add_argument("--include-closed", action="store_true")
+    refresh_parser.add_argument("--page-size", type=int, default=100)
+    refresh_parser.add_argument("--concurrency", type=int, default=8)
+
+    tags_parser = commands.add_parser("tags")
+    tags_group = tags_parser.add_mutually_exclusive_group(required=True)
+    tags_group.add_argument("--sports", action="store_true")
+    tags_group.add_argument("--search")
+
+    events_parser = commands.add_parser("events")
+    events_group = events_parser.add_mutually_exclusive_group(required=True)
+    events_group.add_argument("--slug")
+    events_group.add_argument("--tag", help="Tag slug")
+    events_group.add_argument("--search")
+    events_parser.add_argument("--limit", type=int, default=50)
+
+    markets_parser = commands.add_parser("markets")
+    markets_group = markets_parser.add_mutually_exclusive_group(required=True)
+    markets_group.add_argument("--token")
+    markets_group.add_argument("--event", help="Event slug")
+
+    commands.add_parser("stats")
+
+    args = parser.parse_args()
+    cache = ExplorerCache(args.db)
+    started = time.perf_counter()
+
+    try:
+        if args.command == "refresh":
+            try:
+                result = asyncio.run(refresh(cache, args.full, args.include_closed, args.page_size, args.concurrency))
+            except RuntimeError as e:
+                print(f"[Explorer] {e}")
+                return
+            print(f"[Explorer] {result} in {time.perf_counter() - started:.1f}s")
+        elif args.command == "tags":
+            _print_rows(cache.sports_tags() if args.sports else cache.search_tags(args.search), started)
+        elif args.command == "events":
+            if args.slug:
+                rows = cache.events_by_slug(args.slug)
+            elif args.tag:
+                rows = cache.events_by_tag(args.tag, args.limit)
+            else:
+                rows = cache.search_events(args.search, args.limit)
+            _print_rows(rows, started)
+        elif args.command == "markets":
+            rows = cache.markets_by_token(args.token) if args.token else cache.markets_by_event(args.event)
+            _print_rows(rows, started)
+        elif args.command == "stats":
+            for table, count in cache.stats().items():
+                print(f"{table:<16} {count:>10}")
+            print(f"events watermark (open) {cache.get_meta('events_watermark:open')}")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
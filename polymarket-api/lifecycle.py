@@ -0,0 +1,228 @@
+"""
+Market lifecycle: live -> settling -> archived
+
+Tracked markets are live until their end date passes, then settling: still
+polled, but re-checked against Gamma on every sweep. A market is archived
+when Gamma reports it closed (the winner is the outcome Gamma's final
+prices settle at 1, if any) or when it has been settling longer than the
+settle timeout. Live markets are also re-checked every `refresh` seconds,
+because markets can close before their end date. Closed markets cannot be
+tracked again; a market archived only for settling too long can be, and
+starts a fresh settle period checked against Gamma.
+
+Archiving runs the registered evictors, which remove the market from the
+poller, the client caches, the price matrix and so on. Every sweep also
+drops expired entries from the client caches, so markets that were only
+looked up (never tracked) age out too. Only a compact ArchivedMarket record
+is kept, in a bounded LRU, so steady-state cost follows the live markets
+rather than everything ever watched.
+"""
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from models import Market
+
+LIVE = "live"
+SETTLING = "settling"
+ARCHIVED = "archived"
+
+
+def winning_token(market: Market) -> Optional[str]:
+    """Token of a closed market's outcome whose final Gamma price is 1; None if not decided"""
+    for outcome in market.outcomes:
+        if outcome.token_id and outcome.price is not None and outcome.price >= 0.99:
+            return outcome.token_id
+    return None
+
+
+def parse_end_date(value: Optional[str]) -> Optional[float]:
+    """Unix time of a Gamma end date ("2026-01-05T23:59:00Z" or "2026-01-05")"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class ArchivedMarket:
+    __slots__ = ("market_id", "question", "end_date", "reason", "winner", "archived_at")
+
+    def __init__(self, market_id: str, question: str, end_date: Optional[str],
+                 reason: str, winner: Optional[str], archived_at: float):
+        self.market_id = market_id
+        self.question = question
+        self.end_date = end_date
+        self.reason = reason
+        self.winner = winner
+        self.archived_at = archived_at
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MarketLifecycle:
+    def __init__(self, client, poller, interval: float = 60.0, refresh: float = 900.0,
+                 settle_timeout: float = 86400.0, max_archived: int = 10000):
+        self.client = client
+        self.poller = poller
+        self.interval = interval
+        self.refresh = refresh
+        self.settle_timeout = settle_timeout
+        self.max_archived = max_archived
+
+        # market_id -> when it entered settling (wall clock)
+        self.settling: Dict[str, float] = {}
+        # market_id -> last Gamma check (monotonic)
+        self.last_checked: Dict[str, float] = {}
+        self.archived: "OrderedDict[str, ArchivedMarket]" = OrderedDict()
+        # Called as evictor(record, token_ids) on archive; may be async
+        self.evictors: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_evictor(self, evictor: Callable):
+        self.evictors.append(evictor)
+
+    def check_trackable(self, market_id: str) -> Optional[ArchivedMarket]:
+        """
+        The archive record that keeps a market from being tracked again, or
+        None. A market archived only because it settled too long ("expired")
+        is let back in; as settling it is re-checked against Gamma every sweep.
+        """
+        record = self.archived.get(market_id)
+        if record is not None and record.reason == "expired":
+            del self.archived[market_id]
+            return None
+        return record
+
+    def state(self, market_id: str) -> Optional[str]:
+        if market_id in self.archived:
+            return ARCHIVED
+        if market_id in self.settling:
+            return SETTLING
+        if market_id in self.poller.tracked_markets:
+            return LIVE
+        return None
+
+    async def observe(self, market: Market, now: Optional[float] = None):
+        """Classify a freshly fetched market, archiving it if Gamma says it is closed"""
+        now = now or time.time()
+        self.last_checked[market.id] = time.monotonic()
+
+        if market.closed:
+            await self.archive(market.id, "closed", market=market)
+            return
+
+        self._check_end(market.id, market, now)
+
+    def _check_end(self, market_id: str, market: Market, now: float):
+        end = parse_end_date(market.end_date)
+        if end is not None and now >= end and market_id not in self.settling:
+            self.settling[market_id] = now
+            print(f"[Lifecycle] Settling {market_id}: {market.question[:60]}")
+
+    async def archive(self, market_id: str, reason: str, winner: Optional[str] = None,
+                      market: Optional[Market] = None):
+        if market_id in self.archived:
+            return
+
+        market = market or self.poller.tracked_markets.get(market_id) or self.client.get_cached_market(market_id)
+        token_ids = market.token_ids() if market else []
+        if winner is None and market is not None and market.closed:
+            winner = winning_token(market)
+
+        self.settling.pop(market_id, None)
+        self.last_checked.pop(market_id, None)
+        record = ArchivedMarket(
+            market_id,
+            market.question if market else "",
+            market.end_date if market else None,
+            reason,
+            winner,
+            time.time()
+        )
+        self.archived[market_id] = record
+        while len(self.archived) > self.max_archived:
+            self.archived.popitem(last=False)
+
+        for evictor in self.evictors:
+            try:
+                result = evictor(record, token_ids)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"[Lifecycle] Evictor failed for {market_id}: {e}")
+
+        print(f"[Lifecycle] Archived {market_id} ({reason})")
+
+    async def sweep(self):
+        """Advance every tracked market; Gamma is only asked about settling or stale ones"""
+        now = time.time()
+        monotonic_now = time.monotonic()
+        due = []
+        # TTL-prune the client caches even when nothing is being inserted
+        self.client.prune()
+
+        for market_id, market in list(self.poller.tracked_markets.items()):
+            if market_id in self.archived:
+                # Re-tracked after archiving (e.g. a client subscribed again): drop it again
+                self.poller.untrack_market(market_id)
+                continue
+
+            self._check_end(market_id, market, now)
+
+            if market_id in self.settling:
+                if now - self.settling[market_id] > self.settle_timeout:
+                    await self.archive(market_id, "expired")
+                    continue
+                due.append(market_id)
+            elif monotonic_now - self.last_checked.get(market_id, 0.0) > self.refresh:
+                due.append(market_id)
+
+        # Markets no longer tracked by anyone don't need watching
+        tracked = self.poller.tracked_markets
+        for state in (self.settling, self.last_checked):
+            for market_id in [m for m in state if m not in tracked]:
+                del state[market_id]
+
+        if not due:
+            return
+
+        fresh = await self.client.get_markets_by_ids(due, fresh=True)
+        for market_id, market in fresh.items():
+            # Keep the poller's copy current (outcome prices, closed flag)
+            if market_id in self.poller.tracked_markets:
+                self.poller.track_market(market_id, market)
+            await self.observe(market, now)
+
+    async def run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"[Lifecycle] Sweep error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def stats(self, recent: int = 20) -> Dict:
+        tracked = len(self.poller.tracked_markets)
+        return {
+            "live": tracked - sum(1 for m in self.settling if m in self.poller.tracked_markets),
+            "settling": len(self.settling),
+            "archived": len(self.archived),
+            "recent_archived": [a.to_dict() for a in list(self.archived.values())[-recent:]]
+        }
@@ -3,18 +3,35 @@ Polymarket Sports Betting API Server
 Real-time odds viewer with WebSocket support
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Set
 import asyncio
+import hmac
 import json
+import threading
+import time
 from datetime import datetime
 
+from allocator import allocate
+from config import config
+from lifecycle import ArchivedMarket, MarketLifecycle
+from metrics import (
+    registry, Gauge, broadcast_seconds, price_staleness_seconds,
+    route_seconds, route_upstream_seconds, request_upstream_seconds
+)
+from models import description_store
+from notifications import AlertDispatcher, create_dispatcher
 from polymarket_client import polymarket_client
+from price_matrix import ArbWorkerPool, PriceMatrix
+from profiler import LoopMonitor, sample_profile
+from response_cache import response_cache
+from tick_log import TickRecorder
 from websocket_handler import LiveOddsPoller
+from wire_format import BinarySession, PRICE_SCALE, WIRE_VERSION
 
 app = FastAPI(
     title="Polymarket Sports Odds API",
@@ -31,11 +48,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_routes(request: Request, call_next):
+    """Per-route timing, split into time awaiting upstream calls and everything else"""
+    spent = [0.0]
+    token = request_upstream_seconds.set(spent)
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        request_upstream_seconds.reset(token)
+        # Label by route template so ids in paths don't explode cardinality
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        route_seconds.labels(path, request.method).observe(time.perf_counter() - start)
+        route_upstream_seconds.labels(path, request.method).observe(spent[0])
+
 # Connected WebSocket clients
 connected_clients: Set[WebSocket] = set()
 
-# Live odds poller
+# Subscriber count per tracked market: each /ws connection subscribed to it,
+# plus one for REST /api/track. The poller stops tracking a market at zero.
+market_subscribers: Dict[str, int] = {}
+client_subscriptions: Dict[WebSocket, Set[str]] = {}
+rest_tracked: Set[str] = set()
+# In-flight market_archived notifications (kept referenced until sent)
+notify_tasks: Set[asyncio.Task] = set()
+
+# Clients that negotiated the binary wire format, with their slot tables
+binary_sessions: Dict[WebSocket, BinarySession] = {}
+
+# Background task flushing batched binary frames
+binary_flush_task: Optional[asyncio.Task] = None
+
+# Telegram alert pipeline
+alert_dispatcher: Optional[AlertDispatcher] = None
+
+# Feed-owned shared price matrix and the workers evaluating arbs from it
+price_matrix: Optional[PriceMatrix] = None
+arb_pool: Optional[ArbWorkerPool] = None
+
+# Optional tick log for offline replay (TICK_LOG_PATH)
+tick_recorder: Optional[TickRecorder] = None
+
+# Readiness: the core API serves as soon as startup returns; optional
+# subsystems (CLOB signing stack, arb worker processes) warm up behind it
+readiness: Dict[str, bool] = {"core": False, "arb_workers": False}
+if config.WARM_CLOB:
+    readiness["clob"] = False
+warmup_task: Optional[asyncio.Task] = None
+
+# Always-on event-loop lag sampler and slow-callback log
+loop_monitor = LoopMonitor(config.LOOP_LAG_INTERVAL, config.SLOW_CALLBACK_THRESHOLD)
+
+# Live odds poller and its polling loop
 odds_poller: Optional[LiveOddsPoller] = None
+poll_task: Optional[asyncio.Task] = None
+
+# Moves tracked markets live -> settling -> archived and evicts archived ones
+lifecycle: Optional[MarketLifecycle] = None
 
 # Cache for markets
 markets_cache: Dict = {
@@ -63,41 +134,276 @@ class PriceUpdate(BaseModel):
     timestamp: float
 
 
+class BatchPricesRequest(BaseModel):
+    market_ids: List[str] = []
+    token_ids: List[str] = []
+
+
+class VenueOddsRequest(BaseModel):
+    # token_id -> decimal odds for the same outcome on the other venue
+    odds: Dict[str, float]
+
+
+class AlertRequest(BaseModel):
+    key: str
+    text: str
+    chat_id: Optional[str] = None
+
+
 # WebSocket broadcast
-async def broadcast_update(data: Dict):
-    """Broadcast update to all connected WebSocket clients"""
+async def broadcast_update(data: Dict, fetched_at: Optional[float] = None):
+    """
+    Broadcast update to all connected WebSocket clients. fetched_at is the
+    monotonic time its prices were fetched upstream; staleness is measured
+    when they are actually sent.
+    """
     if not connected_clients:
         return
     
-    message = json.dumps(data)
+    start = time.perf_counter()
+    is_price_update = data.get("type") == "price_update"
+    message = None
     disconnected = set()
     
-    for client in connected_clients:
+    for client in list(connected_clients):
+        session = binary_sessions.get(client)
         try:
+            if session is not None and is_price_update:
+                # Binary clients get this in the next batched frame
+                session.queue_update(data["data"], fetched_at)
+                continue
+            if message is None:
+                message = json.dumps(data)
             await client.send_text(message)
-        except:
+            if fetched_at is not None:
+                price_staleness_seconds.set(time.monotonic() - fetched_at)
+        except Exception as e:
+            print(f"[WS] Dropping client: {e}")
             disconnected.add(client)
     
     # Remove disconnected clients
     for client in disconnected:
-        connected_clients.discard(client)
+        await drop_client(client)
+    
+    broadcast_seconds.observe(time.perf_counter() - start)
+
+
+async def drop_client(client: WebSocket):
+    """Forget a client and close its socket, so it reconnects instead of waiting on a dead session"""
+    connected_clients.discard(client)
+    binary_sessions.pop(client, None)
+    try:
+        await client.close(code=1011)
+    except Exception:
+        pass
+
+
+async def flush_binary_sessions():
+    """Send one batched frame per binary client every flush tick"""
+    while True:
+        await asyncio.sleep(config.WS_FLUSH_INTERVAL)
+        
+        for client, session in list(binary_sessions.items()):
+            try:
+                fetched_at = session.oldest_fetched_at
+                for frame in session.flush():
+                    await client.send_bytes(frame)
+                if fetched_at is not None:
+                    price_staleness_seconds.set(time.monotonic() - fetched_at)
+            except Exception as e:
+                print(f"[WS] Dropping binary client: {e}")
+                await drop_client(client)
+
+
+registry.register(Gauge(
+    "polymarket_ws_clients",
+    "Connected /ws clients",
+    callback=lambda: len(connected_clients)
+))
+registry.register(Gauge(
+    "polymarket_ws_client_queue_depth_max",
+    "Largest number of updates waiting for a binary client's next frame",
+    callback=lambda: max((s.queue_depth for s in binary_sessions.values()), default=0)
+))
+registry.register(Gauge(
+    "polymarket_ws_client_queue_depth_total",
+    "Updates waiting across all binary clients",
+    callback=lambda: sum(s.queue_depth for s in binary_sessions.values())
+))
+
+
+def enable_binary(websocket: WebSocket) -> Dict:
+    """Switch a client to the binary wire format and describe it"""
+    binary_sessions.setdefault(websocket, BinarySession())
+    return {
+        "type": "hello",
+        "format": "binary",
+        "version": WIRE_VERSION,
+        "price_scale": PRICE_SCALE,
+        "flush_interval": config.WS_FLUSH_INTERVAL
+    }
 
 
 # Polling callback
 async def on_price_update(data: Dict):
     """Handle price update from poller"""
+    now = time.time()
+    fetched_at = data.pop("fetched_at", None)
     await broadcast_update({
         "type": "price_update",
         "data": data
-    })
+    }, fetched_at)
+    
+    # After the broadcast, so nothing here can hold up or suppress it
+    try:
+        # Skip markets untracked while this poll was in flight; their rows are released
+        if price_matrix and data["market_id"] in odds_poller.tracked_markets:
+            price_matrix.ingest(data, now)
+        if tick_recorder:
+            tick_recorder.record_update(data, now)
+    except Exception as e:
+        print(f"[Server] Recording update for {data.get('market_id')} failed: {e}")
+
+
+def on_market_untracked(market_id: str, market):
+    """Free the price matrix rows, binary slots and subscriptions of a market nobody tracks any more"""
+    if price_matrix:
+        price_matrix.release_market(market_id, market.token_ids())
+    for session in binary_sessions.values():
+        session.release_market(market_id)
+    # Also reached when the lifecycle archives a market that still has subscribers
+    if market_subscribers.pop(market_id, None):
+        rest_tracked.discard(market_id)
+        affected = []
+        for client, subscriptions in client_subscriptions.items():
+            if market_id in subscriptions:
+                subscriptions.discard(market_id)
+                affected.append(client)
+        if affected:
+            record = lifecycle.archived.get(market_id) if lifecycle else None
+            message = {
+                "type": "market_archived",
+                "market_id": market_id,
+                "reason": record.reason if record else None,
+                "winner": record.winner if record else None
+            }
+            task = asyncio.create_task(notify_clients(affected, message))
+            notify_tasks.add(task)
+            task.add_done_callback(notify_tasks.discard)
+
+
+async def notify_clients(clients: List[WebSocket], message: Dict):
+    """Tell subscribers their market is gone; a failed send is left to the connection's own loop"""
+    for client in clients:
+        try:
+            await client.send_json(message)
+        except Exception:
+            pass
+
+
+def archived_record(market_id: str) -> Optional[ArchivedMarket]:
+    """Why a market may not be tracked again, or None if it may"""
+    return lifecycle.check_trackable(market_id) if lifecycle else None
+
+
+def acquire_market(market_id: str, market):
+    market_subscribers[market_id] = market_subscribers.get(market_id, 0) + 1
+    odds_poller.track_market(market_id, market)
+    ensure_polling()
+
+
+def release_market(market_id: str):
+    """Drop one subscriber; the last one out untracks the market"""
+    remaining = market_subscribers.get(market_id, 0) - 1
+    if remaining > 0:
+        market_subscribers[market_id] = remaining
+        return
+    market_subscribers.pop(market_id, None)
+    odds_poller.untrack_market(market_id)
+
+
+def subscribe_client(websocket: WebSocket, market_id: str, market):
+    subscriptions = client_subscriptions.get(websocket)
+    if subscriptions is None:
+        # Connection already closed
+        return
+    if market_id in subscriptions:
+        # Re-subscribe: refresh the poller's copy without counting twice
+        odds_poller.track_market(market_id, market)
+        return
+    subscriptions.add(market_id)
+    acquire_market(market_id, market)
+
+
+def unsubscribe_client(websocket: WebSocket, market_id: str):
+    subscriptions = client_subscriptions.get(websocket)
+    if subscriptions is not None and market_id in subscriptions:
+        subscriptions.discard(market_id)
+        release_market(market_id)
+
+
+async def warm_optional_subsystems():
+    """Start arb workers (and the CLOB client if WARM_CLOB) without holding up startup"""
+    try:
+        readiness["arb_workers"] = await arb_pool.warm()
+    except Exception as e:
+        print(f"[Server] Arb worker warm-up failed: {e}")
+    if config.WARM_CLOB:
+        readiness["clob"] = await polymarket_client.warm_clob()
+    print(f"[Server] Warm-up done: {readiness}")
+
+
+async def evict_archived(record: ArchivedMarket, token_ids: List[str]):
+    """Remove an archived market from every hot path"""
+    market_id = record.market_id
+    # Untracking also releases the market's price matrix rows
+    odds_poller.untrack_market(market_id)
+    polymarket_client.evict_market(market_id, token_ids)
+    response_cache.invalidate(("market", market_id))
+    
+    for token_id in token_ids:
+        response_cache.invalidate(("orderbook", token_id))
+    
+    if tick_recorder:
+        tick_recorder.record_resolution(market_id, record.winner)
+
+
+def ensure_polling():
+    """Start the polling loop once; concurrent subscribers must not start a second one"""
+    global poll_task
+    if poll_task is None or poll_task.done():
+        poll_task = asyncio.create_task(odds_poller.start_polling())
 
 
 @app.on_event("startup")
 async def startup():
     """Initialize on startup"""
-    global odds_poller
+    global odds_poller, binary_flush_task, alert_dispatcher, price_matrix, arb_pool, tick_recorder, warmup_task
+    global lifecycle
     odds_poller = LiveOddsPoller(polymarket_client)
     odds_poller.on_update(on_price_update)
+    odds_poller.on_untrack(on_market_untracked)
+    binary_flush_task = asyncio.create_task(flush_binary_sessions())
+    alert_dispatcher = create_dispatcher()
+    alert_dispatcher.start()
+    price_matrix = PriceMatrix(config.PRICE_MATRIX_SLOTS)
+    arb_pool = ArbWorkerPool(price_matrix, config.ARB_WORKERS)
+    if config.TICK_LOG_PATH:
+        tick_recorder = TickRecorder(config.TICK_LOG_PATH)
+        print(f"[Server] Recording ticks to {config.TICK_LOG_PATH}")
+    lifecycle = MarketLifecycle(
+        polymarket_client,
+        odds_poller,
+        interval=config.LIFECYCLE_INTERVAL,
+        refresh=config.LIFECYCLE_REFRESH,
+        settle_timeout=config.LIFECYCLE_SETTLE_TIMEOUT,
+        max_archived=config.LIFECYCLE_MAX_ARCHIVED
+    )
+    lifecycle.add_evictor(evict_archived)
+    lifecycle.start()
+    loop_monitor.start()
+    readiness["core"] = True
+    warmup_task = asyncio.create_task(warm_optional_subsystems())
     print("[Server] Polymarket Sports Odds API started")
 
 
@@ -107,6 +413,26 @@ async def shutdown():
     global odds_poller
     if odds_poller:
         odds_poller.stop_polling()
+    if binary_flush_task:
+        binary_flush_task.cancel()
+    if warmup_task:
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except BaseException:
+            pass
+    loop_monitor.stop()
+    if lifecycle:
+        lifecycle.stop()
+    if alert_dispatcher:
+        await alert_dispatcher.stop()
+    if arb_pool:
+        # Workers may still be spawning/attaching; they must be gone before the matrix is unlinked
+        await asyncio.to_thread(arb_pool.shutdown)
+    if price_matrix:
+        price_matrix.close()
+    if tick_recorder:
+        tick_recorder.close()
     await polymarket_client.close()
     print("[Server] Shutdown complete")
 
@@ -123,43 +449,104 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "connected_clients": len(connected_clients)
+        "connected_clients": len(connected_clients),
+        "alerts": alert_dispatcher.stats() if alert_dispatcher else None
+    }
+
+
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the core API serves, with optional subsystems reported but not awaited"""
+    if not readiness["core"]:
+        raise HTTPException(status_code=503, detail="Starting")
+    return {
+        "ready": True,
+        "warm": all(readiness.values()),
+        "subsystems": readiness
     }
 
 
+def require_admin(request: Request):
+    """Admin endpoints are hidden unless ADMIN_TOKEN is set, and need it in X-Admin-Token"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/api/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(request: Request, seconds: float = 10.0, interval_ms: float = 5.0, loop_only: bool = False):
+    """Sample stacks for N seconds; returns collapsed stacks for flamegraph.pl / speedscope"""
+    require_admin(request)
+    seconds = min(max(seconds, 0.1), 60.0)
+    interval = min(max(interval_ms, 1.0), 100.0) / 1000
+    thread_id = threading.get_ident() if loop_only else None
+    
+    # The sampler runs on a worker thread; the loop keeps serving meanwhile
+    stacks = await asyncio.to_thread(sample_profile, seconds, interval, thread_id)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(stacks)
+
+
+@app.get("/api/admin/loop")
+async def admin_loop(request: Request):
+    """Event-loop lag and the stacks of recent stalls above SLOW_CALLBACK_THRESHOLD"""
+    require_admin(request)
+    return loop_monitor.stats()
+
+
+@app.get("/api/admin/routes")
+async def admin_routes(request: Request):
+    """Per-route request count and mean time, split into upstream wait and the rest"""
+    require_admin(request)
+    upstream = route_upstream_seconds.children()
+    routes = []
+    for (path, method), timing in route_seconds.children().items():
+        if not timing.count:
+            continue
+        waited = upstream.get((path, method))
+        upstream_mean = waited.sum / timing.count if waited else 0.0
+        mean = timing.sum / timing.count
+        routes.append({
+            "route": path,
+            "method": method,
+            "count": timing.count,
+            "total_s": round(timing.sum, 3),
+            "mean_ms": round(mean * 1000, 2),
+            "upstream_mean_ms": round(upstream_mean * 1000, 2),
+            "other_mean_ms": round(max(0.0, mean - upstream_mean) * 1000, 2)
+        })
+    routes.sort(key=lambda r: r["total_s"], reverse=True)
+    return {"routes": routes}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/markets/sports")
-async def get_sports_markets(limit: int = 20, cursor: int = 0):
+async def get_sports_markets(request: Request, limit: int = 20, cursor: int = 0):
     """Get sports-related markets with pagination"""
+    return await response_cache.respond(
+        request,
+        ("sports", limit, cursor),
+        config.CATALOG_RESPONSE_TTL,
+        lambda: build_sports_markets(limit, cursor)
+    )
+
+
+async def build_sports_markets(limit: int, cursor: int) -> Dict:
     try:
         # Use cursor as offset
         result = await polymarket_client.get_sports_markets(limit=limit, offset=cursor)
         markets = result["markets"]
         next_cursor = result["next_offset"]
         
-        # Format response
-        formatted_markets = []
-        for market in markets:
-            tokens = market.get("tokens", [])
-            outcomes = []
-            
-            for token in tokens:
-                outcomes.append({
-                    "name": token.get("outcome", "Unknown"),
-                    "token_id": token.get("token_id"),
-                    "price": token.get("price")
-                })
-            
-            formatted_markets.append({
-                "id": market.get("id") or market.get("condition_id"),
-                "question": market.get("question", ""),
-                "description": market.get("description", ""),
-                "outcomes": outcomes,
-                "volume": market.get("volume"),
-                "liquidity": market.get("liquidity"),
-                "end_date": market.get("end_date_iso"),
-                "tags": market.get("tags", []),
-                "image": market.get("image")
-            })
+        # Format response (summaries are built once per market and reused)
+        formatted_markets = [market.to_summary() for market in markets]
         
         return {
             "count": len(formatted_markets),
@@ -171,43 +558,90 @@ async def get_sports_markets(limit: int = 20, cursor: int = 0):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/markets/sports/stream")
+async def stream_sports_markets(page_size: int = 100):
+    """Whole open sports catalog as NDJSON: one market with its current prices per line"""
+    page_size = max(1, min(page_size, 500))
+    return StreamingResponse(sports_catalog_lines(page_size), media_type="application/x-ndjson")
+
+
+async def sports_catalog_lines(page_size: int):
+    """
+    One chunk per upstream page. Only the page being written is held;
+    the client prefetches the next page meanwhile.
+    """
+    try:
+        async for markets in polymarket_client.iter_sports_markets(page_size):
+            # cache=False: a catalog walk must not flush the poller's prices out of the cache
+            midpoints = await polymarket_client.get_midpoints(
+                (token_id for market in markets for token_id in market.token_ids()),
+                cache=False
+            )
+            
+            lines = []
+            for market in markets:
+                line = market.to_summary()
+                line["prices"] = polymarket_client.format_prices(market, midpoints)
+                lines.append(json.dumps(line))
+                # Streamed markets are not cached, so drop their descriptions too
+                if market.id not in polymarket_client.market_cache:
+                    description_store.discard(market.id)
+            
+            yield "\n".join(lines) + "\n"
+    except Exception as e:
+        print(f"[Server] Catalog stream failed: {e}")
+        yield json.dumps({"error": str(e)}) + "\n"
+
+
 @app.get("/api/markets/{market_id}")
-async def get_market_details(market_id: str):
+async def get_market_details(request: Request, market_id: str):
     """Get detailed market info with live prices"""
+    return await response_cache.respond(
+        request,
+        ("market", market_id),
+        config.MARKET_RESPONSE_TTL,
+        lambda: build_market_details(market_id)
+    )
+
+
+async def build_market_details(market_id: str) -> Dict:
     try:
         market = await polymarket_client.get_market_by_id(market_id)
         
         if not market:
             raise HTTPException(status_code=404, detail="Market not found")
-        
+
         # Get live prices
         prices = await polymarket_client.get_prices_for_market(market)
         
-        tokens = market.get("tokens", [])
         outcomes = []
         
-        for token in tokens:
-            outcome_name = token.get("outcome", "Unknown")
-            token_id = token.get("token_id")
-            price_data = prices.get(outcome_name, {})
+        for token in market.outcomes:
+            price_data = prices.get(token.name, {})
             
             outcomes.append({
-                "name": outcome_name,
-                "token_id": token_id,
+                "name": token.name,
+                "token_id": token.token_id,
                 "probability": price_data.get("probability"),
                 "decimal_odds": price_data.get("decimal_odds")
             })
         
-        return {
+        details = {
             "id": market_id,
-            "question": market.get("question", ""),
-            "description": market.get("description", ""),
+            "question": market.question,
+            "description": market.description,
             "outcomes": outcomes,
-            "volume": market.get("volume"),
-            "liquidity": market.get("liquidity"),
-            "end_date": market.get("end_date_iso"),
-            "tags": market.get("tags", [])
+            "volume": market.volume,
+            "liquidity": market.liquidity,
+            "end_date": market.end_date,
+            "tags": list(market.tags)
         }
+        
+        # Archiving evicts the description, so only once the response is built
+        if market.closed and lifecycle:
+            await lifecycle.archive(market_id, "closed", market=market)
+        
+        return details
     
     except HTTPException:
         raise
@@ -228,7 +662,7 @@ async def get_market_prices(market_id: str):
         
         return {
             "market_id": market_id,
-            "question": market.get("question", ""),
+            "question": market.question,
             "prices": prices,
             "timestamp": datetime.utcnow().isoformat()
         }
@@ -238,11 +672,145 @@ async def get_market_prices(market_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/prices/batch")
+async def get_batch_prices(request: BatchPricesRequest):
+    """Get live prices for many markets/tokens in one columnar response"""
+    if len(request.market_ids) + len(request.token_ids) > config.MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {config.MAX_BATCH_IDS} ids per batch"
+        )
+    
+    try:
+        result = await polymarket_client.get_batch_prices(request.market_ids, request.token_ids)
+        result["timestamp"] = datetime.utcnow().isoformat()
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def update_matrix_from_book(token_id: str, orderbook: Dict):
+    """Record top of book for a token of a tracked market"""
+    if not price_matrix or token_id not in odds_poller.token_index:
+        return
+    
+    try:
+        bids = [(float(b["price"]), float(b["size"])) for b in orderbook.get("bids", [])]
+        asks = [(float(a["price"]), float(a["size"])) for a in orderbook.get("asks", [])]
+    except (KeyError, TypeError, ValueError):
+        return
+    
+    best_bid = max(bids, default=None)
+    best_ask = min(asks, default=None)
+    now = time.time()
+    bid = best_bid[0] if best_bid else None
+    ask = best_ask[0] if best_ask else None
+    ask_size = best_ask[1] if best_ask else None
+    try:
+        price_matrix.update_token(token_id, now, bid=bid, ask=ask, ask_size=ask_size)
+    except ValueError as e:
+        print(f"[Server] Top of book for {token_id[:20]} not recorded: {e}")
+        return
+    if tick_recorder:
+        tick_recorder.record_book(token_id, ask, ask_size, bid, now)
+
+
+@app.post("/api/venue-odds")
+async def set_venue_odds(request: VenueOddsRequest):
+    """Feed other-venue decimal odds per Polymarket outcome token of a tracked market"""
+    now = time.time()
+    accepted = 0
+    ignored = []
+    for token_id, odds in request.odds.items():
+        # Only tracked markets get matrix rows; anything else would hold a slot forever
+        if token_id not in odds_poller.token_index:
+            ignored.append(token_id)
+            continue
+        try:
+            price_matrix.update_token(token_id, now, venue_odds=odds)
+        except ValueError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        accepted += 1
+        if tick_recorder:
+            tick_recorder.record_venue(token_id, odds, now)
+    return {"status": "ok", "count": accepted, "ignored": ignored}
+
+
+@app.get("/api/arbs")
+async def get_arbs(stake: float = 100.0):
+    """Evaluate every tracked two-outcome market for arbitrage across the worker pool"""
+    opportunities = await arb_pool.evaluate(stake, config.ARB_MAX_QUOTE_AGE)
+    opportunities.sort(key=lambda o: o["roi"], reverse=True)
+    return {
+        "count": len(opportunities),
+        "opportunities": opportunities,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@app.get("/api/lifecycle")
+async def get_lifecycle(recent: int = 20):
+    """Live / settling / archived market counts and the most recently archived markets"""
+    return lifecycle.stats(max(0, min(recent, 500)))
+
+
+@app.get("/api/allocation")
+async def get_allocation(
+    payroll: float,
+    blocked: float = 0.0,
+    max_trades: int = 0,
+    min_stake: float = 1.0,
+    max_stake: Optional[float] = None,
+    poly_balance: Optional[float] = None,
+    venue_balance: Optional[float] = None
+):
+    """Split free capital across all live arbitrage opportunities at once"""
+    if payroll <= 0:
+        raise HTTPException(status_code=400, detail="payroll must be positive")
+    
+    # Size each opportunity up to its depth (or max_stake); allocate() picks the amounts
+    opportunities = await arb_pool.evaluate(max_stake or payroll, config.ARB_MAX_QUOTE_AGE)
+    
+    balances = {}
+    if poly_balance is not None:
+        balances["polymarket"] = poly_balance
+    if venue_balance is not None:
+        balances["venue"] = venue_balance
+    
+    result = allocate(
+        opportunities, payroll, blocked, max_trades, balances, min_stake, max_stake,
+        now=time.time(), max_age=config.ARB_MAX_QUOTE_AGE
+    )
+    result["timestamp"] = datetime.utcnow().isoformat()
+    return result
+
+
+@app.post("/api/alerts")
+async def submit_alert(alert: AlertRequest):
+    """Queue an arbitrage alert; repeats of the same key are deduplicated and rate limited"""
+    chat_id = alert.chat_id or config.TELEGRAM_CHAT_ID
+    if not chat_id:
+        raise HTTPException(status_code=400, detail="chat_id required (no TELEGRAM_CHAT_ID configured)")
+    
+    queued = alert_dispatcher.submit(alert.key, alert.text, chat_id)
+    return {"status": "queued" if queued else "cooldown", "key": alert.key}
+
+
 @app.get("/api/orderbook/{token_id}")
-async def get_orderbook(token_id: str):
+async def get_orderbook(request: Request, token_id: str):
     """Get orderbook (bids/asks) for a token"""
+    return await response_cache.respond(
+        request,
+        ("orderbook", token_id),
+        config.ORDERBOOK_RESPONSE_TTL,
+        lambda: build_orderbook(token_id)
+    )
+
+
+async def build_orderbook(token_id: str) -> Dict:
     try:
         orderbook = await polymarket_client.get_market_orderbook(token_id)
+        update_matrix_from_book(token_id, orderbook)
         return orderbook
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -259,11 +827,16 @@ async def track_market(market_id: str):
         if not market:
             raise HTTPException(status_code=404, detail="Market not found")
         
-        odds_poller.track_market(market_id, market)
+        record = archived_record(market_id)
+        if record:
+            raise HTTPException(status_code=410, detail=f"Market archived ({record.reason})")
         
-        # Start polling if not already running
-        if not odds_poller.running:
-            asyncio.create_task(odds_poller.start_polling())
+        if market_id in rest_tracked:
+            odds_poller.track_market(market_id, market)
+        else:
+            # REST tracking counts as one subscriber however often it is requested
+            rest_tracked.add(market_id)
+            acquire_market(market_id, market)
         
         return {"status": "tracking", "market_id": market_id}
     
@@ -275,12 +848,139 @@ async def track_market(market_id: str):
 
 @app.delete("/api/track/{market_id}")
 async def untrack_market(market_id: str):
-    """Stop tracking a market"""
-    global odds_poller
+    """Stop tracking a market via REST; /ws subscribers keep it tracked"""
+    if market_id in rest_tracked:
+        rest_tracked.discard(market_id)
+        release_market(market_id)
     
-    odds_poller.untrack_market(market_id)
+    return {
+        "status": "untracked",
+        "market_id": market_id,
+        "subscribers": market_subscribers.get(market_id, 0)
+    }
+
+
+async def ws_subscribe(websocket: WebSocket, message: Dict, seq: int, intents: Dict[str, int]):
+    """Subscribe to one market, or to a list with one batched lookup and one snapshot frame"""
+    if message.get("market_ids") is None:
+        market_id = message.get("market_id")
+        if not market_id:
+            return
+        market = await polymarket_client.get_market_by_id(market_id)
+        if intents.get(market_id) != seq:
+            # Superseded by a later (un)subscribe, which sends its own reply
+            return
+        if not market:
+            intents.pop(market_id, None)
+            await websocket.send_json({
+                "type": "error",
+                "request_id": message.get("request_id"),
+                "market_id": market_id,
+                "message": "Market not found"
+            })
+            return
+        record = archived_record(market_id)
+        if record:
+            intents.pop(market_id, None)
+            await websocket.send_json({
+                "type": "market_archived",
+                "request_id": message.get("request_id"),
+                "market_id": market_id,
+                "reason": record.reason,
+                "winner": record.winner
+            })
+            return
+        subscribe_client(websocket, market_id, market)
+        await websocket.send_json({
+            "type": "subscribed",
+            "market_id": market_id
+        })
+        return
+    
+    requested = list(dict.fromkeys(str(m) for m in message["market_ids"]))
+    found = await polymarket_client.get_markets_by_ids(requested)
+    missing = [m for m in requested if m not in found]
+    for market_id in missing:
+        if intents.get(market_id) == seq:
+            intents.pop(market_id, None)
+    # Skip markets the client unsubscribed from (or subscribed to again) while the lookup ran
+    markets = {m: market for m, market in found.items() if intents.get(m) == seq}
+    archived = [m for m in markets if archived_record(m)]
+    for market_id in archived:
+        intents.pop(market_id, None)
+        del markets[market_id]
+    
+    for market_id, market in markets.items():
+        subscribe_client(websocket, market_id, market)
     
-    return {"status": "untracked", "market_id": market_id}
+    midpoints = await polymarket_client.get_midpoints(
+        token_id for market in markets.values() for token_id in market.token_ids()
+    )
+    session = binary_sessions.get(websocket)
+    snapshot = {}
+    for market_id, market in markets.items():
+        prices = polymarket_client.format_prices(market, midpoints)
+        if session is not None:
+            # Binary clients get the snapshot in their next batched frame
+            session.queue_update({"market_id": market_id, "question": market.question, "prices": prices})
+        else:
+            snapshot[market_id] = {"question": market.question, "prices": prices}
+    
+    await websocket.send_json({
+        "type": "subscribed",
+        "request_id": message.get("request_id"),
+        "market_ids": list(markets),
+        "missing": missing,
+        "archived": archived,
+        "snapshot": snapshot,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+
+async def ws_prices(websocket: WebSocket, message: Dict, seq: int, intents: Dict[str, int]):
+    market_ids = message.get("market_ids") or []
+    token_ids = message.get("token_ids") or []
+    result = await polymarket_client.get_batch_prices(market_ids, token_ids)
+    await websocket.send_json({
+        "type": "prices",
+        "request_id": message.get("request_id"),
+        "data": result,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+
+# Messages that wait on upstream calls run on the connection's workers
+WS_WORKER_HANDLERS = {
+    "subscribe": ws_subscribe,
+    "prices": ws_prices
+}
+
+
+async def ws_worker(websocket: WebSocket, queue: asyncio.Queue, intents: Dict[str, int]):
+    while True:
+        handler, message, seq = await queue.get()
+        try:
+            await handler(websocket, message, seq, intents)
+        except WebSocketDisconnect:
+            return
+        except Exception as e:
+            print(f"[WS] {message.get('type')} failed: {e}")
+            try:
+                await websocket.send_json({
+                    "type": "error",
+                    "request_id": message.get("request_id"),
+                    "message": str(e)
+                })
+            except Exception:
+                return
+        finally:
+            queue.task_done()
+
+
+def message_ids(message: Dict) -> List[str]:
+    if message.get("market_ids") is not None:
+        return [str(m) for m in message["market_ids"]]
+    return [message["market_id"]] if message.get("market_id") else []
 
 
 @app.websocket("/ws")
@@ -288,8 +988,19 @@ async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
     await websocket.accept()
     connected_clients.add(websocket)
+    client_subscriptions[websocket] = set()
     print(f"[WS] Client connected. Total: {len(connected_clients)}")
     
+    # Subscribe/prices requests run on a few workers so slow lookups don't
+    # hold up pings; intents records each market's latest (un)subscribe
+    queue: asyncio.Queue = asyncio.Queue(config.WS_CLIENT_QUEUE)
+    intents: Dict[str, int] = {}
+    workers = [
+        asyncio.create_task(ws_worker(websocket, queue, intents))
+        for _ in range(config.WS_CLIENT_WORKERS)
+    ]
+    seq = 0
+    
     try:
         # Send initial data
         await websocket.send_json({
@@ -298,36 +1009,69 @@ async def websocket_endpoint(websocket: WebSocket):
             "timestamp": datetime.utcnow().isoformat()
         })
         
+        if websocket.query_params.get("format") == "binary":
+            await websocket.send_json(enable_binary(websocket))
+        
         # Keep connection alive and handle messages
         while True:
             try:
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=30)
                 message = json.loads(data)
+                kind = message.get("type")
+                seq += 1
                 
-                # Handle subscribe/unsubscribe requests
-                if message.get("type") == "subscribe":
-                    market_id = message.get("market_id")
-                    if market_id:
-                        market = await polymarket_client.get_market_by_id(market_id)
-                        if market:
-                            odds_poller.track_market(market_id, market)
-                            if not odds_poller.running:
-                                asyncio.create_task(odds_poller.start_polling())
+                if kind in WS_WORKER_HANDLERS:
+                    ids = message_ids(message)
+                    token_ids = (message.get("token_ids") or []) if kind == "prices" else []
+                    if len(ids) + len(token_ids) > config.MAX_BATCH_IDS:
+                        await websocket.send_json({
+                            "type": "error",
+                            "request_id": message.get("request_id"),
+                            "message": f"At most {config.MAX_BATCH_IDS} ids per batch"
+                        })
+                        continue
+                    
+                    try:
+                        queue.put_nowait((WS_WORKER_HANDLERS[kind], message, seq))
+                    except asyncio.QueueFull:
+                        await websocket.send_json({
+                            "type": "error",
+                            "request_id": message.get("request_id"),
+                            "message": "Too many requests in flight"
+                        })
+                        continue
+                    
+                    if kind == "subscribe":
+                        for market_id in ids:
+                            intents[market_id] = seq
+                
+                elif kind == "unsubscribe":
+                    ids = message_ids(message)
+                    for market_id in ids:
+                        intents.pop(market_id, None)
+                        unsubscribe_client(websocket, market_id)
+                    
+                    if message.get("market_ids") is None:
+                        if ids:
                             await websocket.send_json({
-                                "type": "subscribed",
-                                "market_id": market_id
+                                "type": "unsubscribed",
+                                "market_id": ids[0]
                             })
-                
-                elif message.get("type") == "unsubscribe":
-                    market_id = message.get("market_id")
-                    if market_id:
-                        odds_poller.untrack_market(market_id)
+                    else:
                         await websocket.send_json({
                             "type": "unsubscribed",
-                            "market_id": market_id
+                            "request_id": message.get("request_id"),
+                            "market_ids": ids
                         })
                 
-                elif message.get("type") == "ping":
+                elif kind == "hello":
+                    if message.get("format") == "binary":
+                        await websocket.send_json(enable_binary(websocket))
+                    else:
+                        binary_sessions.pop(websocket, None)
+                        await websocket.send_json({"type": "hello", "format": "json"})
+                
+                elif kind == "ping":
                     await websocket.send_json({"type": "pong"})
             
             except asyncio.TimeoutError:
@@ -339,7 +1083,12 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"[WS] Error: {e}")
     finally:
+        for worker in workers:
+            worker.cancel()
         connected_clients.discard(websocket)
+        binary_sessions.pop(websocket, None)
+        for market_id in client_subscriptions.pop(websocket, ()):
+            release_market(market_id)
         print(f"[WS] Client disconnected. Total: {len(connected_clients)}")
 
 
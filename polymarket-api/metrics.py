@@ -0,0 +1,232 @@
+"""
+In-process metrics exposed in Prometheus text format on /metrics
+
+Everything runs on the event loop thread, so counters are plain attribute
+increments with no locks. Label children are created once and cached, and
+histogram buckets are preallocated. labels() itself packs its arguments and
+does a dict lookup, so hot paths resolve their children once and keep them
+(see polymarket_client and ResponseCache); recording a sample on a held
+child does not allocate. Values that are cheap to read but expensive to track (queue
+depths, cache sizes) are gauges computed by a callback at scrape time.
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; tuned for upstream HTTP calls and poll cycles
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _merge_labels(labels: str, extra: str) -> str:
+    if not labels:
+        return "{" + extra + "}"
+    return labels[:-1] + "," + extra + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._new_child()
+            self._children[values] = child
+        return child
+
+    def children(self) -> Dict[Tuple[str, ...], "_Metric"]:
+        """Label values -> child series"""
+        return dict(self._children)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self):
+        if self.labelnames:
+            for values, child in self._children.items():
+                yield _format_labels(self.labelnames, values), child
+        else:
+            yield "", self
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self._series():
+            lines.extend(child._render_samples(self.name, labels))
+        return lines
+
+    def _render_samples(self, name: str, labels: str) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _render_samples(self, name: str, labels: str) -> List[str]:
+        return [f"{name}{labels} {self.value}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+        self.callback = callback
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value: float):
+        self.value = value
+
+    def _render_samples(self, name: str, labels: str) -> List[str]:
+        value = self.callback() if self.callback else self.value
+        return [f"{name}{labels} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus +Inf; counts are per-bucket, cumulated at render
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _render_samples(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = _merge_labels(labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        le = _merge_labels(labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{le} {self.count}")
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Upstream calls
+UPSTREAM_GAMMA_MARKETS = "gamma_markets"
+UPSTREAM_GAMMA_MARKET = "gamma_market"
+UPSTREAM_GAMMA_EVENTS = "gamma_events"
+UPSTREAM_GAMMA_TAGS = "gamma_tags"
+UPSTREAM_CLOB_BOOK = "clob_book"
+UPSTREAM_CLOB_PRICE = "clob_price"
+UPSTREAM_CLOB_MIDPOINT = "clob_midpoint"
+
+upstream_latency = registry.register(Histogram(
+    "polymarket_upstream_request_seconds",
+    "Latency of upstream Gamma/CLOB requests",
+    ("endpoint",)
+))
+upstream_errors = registry.register(Counter(
+    "polymarket_upstream_errors_total",
+    "Failed upstream Gamma/CLOB requests",
+    ("endpoint",)
+))
+
+# Poller
+poll_cycle_seconds = registry.register(Histogram(
+    "polymarket_poll_cycle_seconds",
+    "Duration of one LiveOddsPoller cycle over all tracked markets"
+))
+poll_lag_seconds = registry.register(Gauge(
+    "polymarket_poll_lag_seconds",
+    "How far the latest poll cycle started behind its schedule"
+))
+
+# Client fan-out
+broadcast_seconds = registry.register(Histogram(
+    "polymarket_broadcast_seconds",
+    "Time to fan one update out to all /ws clients",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+))
+price_staleness_seconds = registry.register(Gauge(
+    "polymarket_price_staleness_seconds",
+    "Age of the most recently sent price, from upstream fetch (including time in the price cache) to client send"
+))
+
+# Caches
+cache_requests = registry.register(Counter(
+    "polymarket_cache_requests_total",
+    "Cache lookups by cache and result",
+    ("cache", "result")
+))
+
+# Event loop and HTTP routes
+loop_lag_seconds = registry.register(Histogram(
+    "polymarket_loop_lag_seconds",
+    "How late the event loop ran a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+route_seconds = registry.register(Histogram(
+    "polymarket_http_request_seconds",
+    "HTTP request duration by route template",
+    ("route", "method")
+))
+route_upstream_seconds = registry.register(Histogram(
+    "polymarket_http_upstream_seconds",
+    "Upstream call time within an HTTP request (summed over concurrent calls)",
+    ("route", "method")
+))
+
+# Upstream seconds accumulated by the request being handled; None outside HTTP requests
+request_upstream_seconds: ContextVar[Optional[List[float]]] = ContextVar("request_upstream_seconds", default=None)
@@ -0,0 +1,167 @@
+"""
+Compact in-memory market model
+
+Gamma returns large dicts per market (long descriptions, nested event data,
+repeated tag lists). Markets are parsed once into slotted objects: outcome
+names and tags are interned so thousands of markets share the same strings,
+descriptions live compressed in a side store and are only inflated when an
+endpoint asks for them, and the API summary is built once per market.
+"""
+
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(str(value)) if value is not None else ""
+
+
+def _tag_name(tag: Any) -> str:
+    # Gamma returns tags either as plain strings or as {"label", "slug", ...}
+    if isinstance(tag, dict):
+        return _intern(tag.get("label") or tag.get("slug") or "")
+    return _intern(tag)
+
+
+class DescriptionStore:
+    """Side store keeping market descriptions zlib-compressed until read"""
+
+    def __init__(self):
+        self._data: Dict[str, bytes] = {}
+
+    def put(self, market_id: str, description: Optional[str]):
+        if description:
+            self._data[market_id] = zlib.compress(description.encode("utf-8"))
+        else:
+            self._data.pop(market_id, None)
+
+    def get(self, market_id: str) -> str:
+        blob = self._data.get(market_id)
+        return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+    def discard(self, market_id: str):
+        self._data.pop(market_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Outcome:
+    __slots__ = ("name", "token_id", "price")
+
+    def __init__(self, name: str, token_id: Optional[str], price: Optional[float]):
+        self.name = name
+        self.token_id = token_id
+        self.price = price
+
+
+class Market:
+    __slots__ = (
+        "id", "question", "outcomes", "volume", "liquidity", "end_date",
+        "tags", "image", "active", "closed", "_summary"
+    )
+
+    def __init__(
+        self,
+        id: str,
+        question: str,
+        outcomes: Tuple[Outcome, ...],
+        volume: Optional[float] = None,
+        liquidity: Optional[float] = None,
+        end_date: Optional[str] = None,
+        tags: Tuple[str, ...] = (),
+        image: Optional[str] = None,
+        active: bool = True,
+        closed: bool = False
+    ):
+        self.id = id
+        self.question = question
+        self.outcomes = outcomes
+        self.volume = volume
+        self.liquidity = liquidity
+        self.end_date = end_date
+        self.tags = tags
+        self.image = image
+        self.active = active
+        self.closed = closed
+        self._summary: Optional[Dict] = None
+
+    @classmethod
+    def from_gamma(cls, data: Dict) -> "Market":
+        """Build a market from a Gamma /markets or /events market dict"""
+        market_id = str(data.get("id") or data.get("condition_id") or "")
+
+        outcomes = tuple(
+            Outcome(
+                _intern(token.get("outcome", "Unknown")),
+                token.get("token_id"),
+                _to_float(token.get("price"))
+            )
+            for token in data.get("tokens", [])
+        )
+
+        description_store.put(market_id, data.get("description"))
+
+        end_date = data.get("end_date_iso") or data.get("endDate")
+
+        return cls(
+            id=market_id,
+            question=data.get("question", ""),
+            outcomes=outcomes,
+            volume=_to_float(data.get("volume")),
+            liquidity=_to_float(data.get("liquidity")),
+            end_date=_intern(end_date) if end_date else None,
+            tags=tuple(_tag_name(t) for t in data.get("tags") or []),
+            image=data.get("image") or None,
+            active=bool(data.get("active", True)),
+            closed=bool(data.get("closed", False))
+        )
+
+    @property
+    def description(self) -> str:
+        return description_store.get(self.id)
+
+    def token_ids(self) -> List[str]:
+        return [o.token_id for o in self.outcomes if o.token_id]
+
+    def outcome_for_token(self, token_id: str) -> Optional[Outcome]:
+        for outcome in self.outcomes:
+            if outcome.token_id == token_id:
+                return outcome
+        return None
+
+    def to_summary(self) -> Dict:
+        """
+        Catalog representation used by /api/markets/sports. The formatted
+        dict is built once and reused; only the description is filled in per
+        call so it is not kept inflated next to every cached summary.
+        """
+        if self._summary is None:
+            self._summary = {
+                "id": self.id,
+                "question": self.question,
+                "outcomes": [
+                    {"name": o.name, "token_id": o.token_id, "price": o.price}
+                    for o in self.outcomes
+                ],
+                "volume": self.volume,
+                "liquidity": self.liquidity,
+                "end_date": self.end_date,
+                "tags": list(self.tags),
+                "image": self.image
+            }
+        return {**self._summary, "description": self.description}
+
+
+# Shared description side store
+description_store = DescriptionStore()
@@ -0,0 +1,419 @@
+"""
+Alert dispatch pipeline for arbitrage notifications
+
+Alerts are enqueued (and journaled to SQLite so a restart does not lose
+them), deduplicated per opportunity key, held back during a cooldown after
+an opportunity was last sent, and drained per chat through a token bucket.
+When more alerts are waiting for a chat than its bucket allows, they are
+coalesced into a single digest message, so a burst of opportunities costs
+a bounded number of sends.
+
+A failed send is retried with exponential backoff (or after the
+`retry_after` Telegram asks for) up to a maximum number of attempts. Errors
+that retrying cannot fix, such as a 400 for a bad chat id, move the alert
+straight to the dead-letter table so one bad message cannot block its chat.
+"""
+
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from config import config
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+
+class SendError(Exception):
+    """A sink failure; permanent ones are not retried, retry_after is the wait the API asked for"""
+
+    def __init__(self, message: str, permanent: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+class Alert:
+    __slots__ = ("key", "chat_id", "text", "created_at", "row_id", "attempts")
+
+    def __init__(self, key: str, chat_id: str, text: str,
+                 created_at: Optional[float] = None, row_id: Optional[int] = None):
+        self.key = key
+        self.chat_id = chat_id
+        self.text = text
+        self.created_at = created_at if created_at is not None else time.time()
+        self.row_id = row_id
+        self.attempts = 0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+# Sinks
+
+class TelegramSink:
+    """
+    Sends messages through the Telegram Bot API. Messages go out as plain
+    text: alert text comes from market titles, and a stray `_` or `*` under
+    a parse_mode makes Telegram reject the whole message.
+    """
+
+    def __init__(self, bot_token: str):
+        self.url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        self.http_client: Optional[httpx.AsyncClient] = None
+
+    async def send(self, chat_id: str, text: str):
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(timeout=10.0)
+        response = await self.http_client.post(self.url, json={"chat_id": chat_id, "text": text})
+        if response.status_code < 400:
+            return
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        description = f"{response.status_code} {body.get('description', response.reason_phrase)}"
+
+        if response.status_code == 429:
+            retry_after = (body.get("parameters") or {}).get("retry_after")
+            raise SendError(description, retry_after=float(retry_after) if retry_after else None)
+        # Any other 4xx is about this request and fails the same way every time
+        raise SendError(description, permanent=response.status_code < 500)
+
+    async def close(self):
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+
+
+class StubSink:
+    """Records messages instead of sending them (tests, local runs); `failures` are raised by the first sends"""
+
+    def __init__(self, failures: Optional[List[Exception]] = None):
+        self.sent: List[Tuple[str, str]] = []
+        self.failures = list(failures or [])
+
+    async def send(self, chat_id: str, text: str):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+        print(f"[Alerts] -> {chat_id}: {text[:80]}")
+
+    async def close(self):
+        pass
+
+
+class AlertJournal:
+    """
+    SQLite journal of alerts not yet delivered, plus the dead letters.
+    Writes are committed in batches by commit(), which the dispatch loop
+    calls once per pass, so submit() never waits on a disk sync.
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "id INTEGER PRIMARY KEY, key TEXT, chat_id TEXT, text TEXT, created_at REAL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            "id INTEGER PRIMARY KEY, key TEXT, chat_id TEXT, text TEXT, created_at REAL, "
+            "attempts INTEGER, error TEXT, failed_at REAL)"
+        )
+        self.db.commit()
+
+    def add(self, alert: Alert) -> int:
+        cursor = self.db.execute(
+            "INSERT INTO alerts (key, chat_id, text, created_at) VALUES (?, ?, ?, ?)",
+            (alert.key, alert.chat_id, alert.text, alert.created_at)
+        )
+        return cursor.lastrowid
+
+    def remove(self, row_ids: List[int]):
+        if row_ids:
+            self.db.executemany("DELETE FROM alerts WHERE id = ?", [(r,) for r in row_ids])
+
+    def dead_letter(self, alerts: List[Alert], error: str):
+        """Move alerts that will not be retried out of the pending table"""
+        now = time.time()
+        self.db.executemany(
+            "INSERT INTO dead_letters (key, chat_id, text, created_at, attempts, error, failed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(a.key, a.chat_id, a.text, a.created_at, a.attempts, error, now) for a in alerts]
+        )
+        self.remove([a.row_id for a in alerts if a.row_id is not None])
+
+    def commit(self):
+        if self.db.in_transaction:
+            self.db.commit()
+
+    def pending(self) -> List[Alert]:
+        rows = self.db.execute(
+            "SELECT id, key, chat_id, text, created_at FROM alerts ORDER BY id"
+        ).fetchall()
+        return [Alert(key, chat_id, text, created_at, row_id) for row_id, key, chat_id, text, created_at in rows]
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+class AlertDispatcher:
+    def __init__(self, sink, journal: Optional[AlertJournal] = None,
+                 cooldown: float = 60.0, rate: float = 1.0, burst: float = 3.0,
+                 max_attempts: int = 5, max_backoff: float = 300.0):
+        self.sink = sink
+        self.journal = journal
+        self.cooldown = cooldown
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        # chat_id -> opportunity key -> latest alert (insertion order = age)
+        self.pending: Dict[str, "OrderedDict[str, Alert]"] = {}
+        # opportunity key -> last time it was sent
+        self.last_sent: Dict[str, float] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        # chat_id -> monotonic time before which a failed chat is not retried
+        self.retry_at: Dict[str, float] = {}
+
+        self.sent_messages = 0
+        self.coalesced = 0
+        self.suppressed = 0
+        self.failed_sends = 0
+        self.dead_lettered = 0
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        if journal:
+            for alert in journal.pending():
+                self._queue(alert)
+
+    def _queue(self, alert: Alert):
+        chat_pending = self.pending.setdefault(alert.chat_id, OrderedDict())
+        previous = chat_pending.pop(alert.key, None)
+        if previous is not None:
+            # Same opportunity re-reported before it went out: keep the latest text
+            if self.journal and previous.row_id is not None:
+                self.journal.remove([previous.row_id])
+            self.suppressed += 1
+        chat_pending[alert.key] = alert
+
+    def submit(self, key: str, text: str, chat_id: Optional[str] = None) -> bool:
+        """
+        Queue an alert. Returns False if the opportunity is cooling down and
+        the alert was dropped.
+        """
+        chat_id = chat_id or config.TELEGRAM_CHAT_ID
+        last = self.last_sent.get(key)
+        if last is not None and time.monotonic() - last < self.cooldown:
+            self.suppressed += 1
+            return False
+
+        alert = Alert(key, chat_id, text)
+        if self.journal:
+            alert.row_id = self.journal.add(alert)
+        self._queue(alert)
+        self._wakeup.set()
+        return True
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    @staticmethod
+    def _digest(alerts: List[Alert]) -> str:
+        header = f"{len(alerts)} arbitrage opportunities\n\n"
+        parts = []
+        length = len(header)
+        for i, alert in enumerate(alerts):
+            part = alert.text.strip()
+            if length + len(part) + 2 > MAX_MESSAGE_LENGTH - 40:
+                parts.append(f"...and {len(alerts) - i} more")
+                break
+            parts.append(part)
+            length += len(part) + 2
+        return header + "\n\n".join(parts)
+
+    async def _drain_chat(self, chat_id: str) -> float:
+        """Send what the bucket allows for one chat; returns seconds until it can send again"""
+        chat_pending = self.pending.get(chat_id)
+        bucket = self._bucket(chat_id)
+
+        backoff = self.retry_at.get(chat_id, 0.0) - time.monotonic()
+        if backoff > 0:
+            return backoff
+        self.retry_at.pop(chat_id, None)
+
+        while chat_pending:
+            if not bucket.try_take():
+                return bucket.wait_time()
+
+            # With a single send left in the bucket and more than one alert
+            # waiting, everything goes out as one digest
+            if len(chat_pending) > 1 and bucket.tokens < 1:
+                alerts = list(chat_pending.values())
+                chat_pending.clear()
+                text = self._digest(alerts)
+                self.coalesced += len(alerts)
+            else:
+                _, alert = chat_pending.popitem(last=False)
+                alerts = [alert]
+                text = alert.text
+
+            try:
+                await self.sink.send(chat_id, text)
+                self.sent_messages += 1
+            except Exception as e:
+                self.failed_sends += 1
+                delay = self._on_send_failed(chat_id, alerts, e)
+                if delay is None:
+                    continue
+                self.retry_at[chat_id] = time.monotonic() + delay
+                return max(bucket.wait_time(), delay)
+
+            now = time.monotonic()
+            for alert in alerts:
+                self.last_sent[alert.key] = now
+            if self.journal:
+                self.journal.remove([a.row_id for a in alerts if a.row_id is not None])
+
+        return 0.0
+
+    def _on_send_failed(self, chat_id: str, alerts: List[Alert], error: Exception) -> Optional[float]:
+        """
+        Requeue retriable alerts at the front of the chat's queue and
+        dead-letter the rest. Returns the backoff before the chat is tried
+        again, or None if nothing was requeued.
+        """
+        permanent = isinstance(error, SendError) and error.permanent
+        retry_after = error.retry_after if isinstance(error, SendError) else None
+        print(f"[Alerts] Send to {chat_id} failed{' permanently' if permanent else ''}: {error}")
+
+        retry, dead = [], []
+        for alert in alerts:
+            # Being rate limited says nothing about the message, so it costs no attempt
+            if retry_after is None:
+                alert.attempts += 1
+            if permanent or alert.attempts >= self.max_attempts:
+                dead.append(alert)
+            else:
+                retry.append(alert)
+
+        if dead:
+            self.dead_lettered += len(dead)
+            print(f"[Alerts] Dead-lettered {len(dead)} alert(s) for {chat_id}: {error}")
+            if self.journal:
+                self.journal.dead_letter(dead, str(error))
+
+        chat_pending = self.pending.setdefault(chat_id, OrderedDict())
+        for alert in reversed(retry):
+            if alert.key not in chat_pending:
+                chat_pending[alert.key] = alert
+                chat_pending.move_to_end(alert.key, last=False)
+
+        if not retry:
+            return None
+        if retry_after is not None:
+            return retry_after
+        attempts = max(alert.attempts for alert in retry)
+        return min(self.max_backoff, (1.0 / self.rate) * 2 ** (attempts - 1))
+
+    async def run(self):
+        """Dispatch loop: drain every chat, then sleep until new alerts or a bucket refills"""
+        while True:
+            self._wakeup.clear()
+            delays = []
+            for chat_id in list(self.pending):
+                delay = await self._drain_chat(chat_id)
+                if delay > 0:
+                    delays.append(delay)
+                elif not self.pending.get(chat_id):
+                    self.pending.pop(chat_id, None)
+
+            self._prune_cooldowns()
+            if self.journal:
+                self.journal.commit()
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(delays) if delays else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune_cooldowns(self):
+        cutoff = time.monotonic() - self.cooldown
+        expired = [k for k, t in self.last_sent.items() if t < cutoff]
+        for key in expired:
+            del self.last_sent[key]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.sink.close()
+        if self.journal:
+            self.journal.close()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": sum(len(p) for p in self.pending.values()),
+            "sent_messages": self.sent_messages,
+            "coalesced": self.coalesced,
+            "suppressed": self.suppressed,
+            "failed_sends": self.failed_sends,
+            "dead_lettered": self.dead_lettered
+        }
+
+
+def create_dispatcher() -> AlertDispatcher:
+    """Build the dispatcher from config: Telegram if a bot token is set, stub otherwise"""
+    if config.TELEGRAM_BOT_TOKEN:
+        sink = TelegramSink(config.TELEGRAM_BOT_TOKEN)
+    else:
+        sink = StubSink()
+
+    journal = AlertJournal(config.ALERT_JOURNAL_PATH) if config.ALERT_JOURNAL_PATH else None
+
+    return AlertDispatcher(
+        sink,
+        journal=journal,
+        cooldown=config.ALERT_COOLDOWN,
+        rate=config.ALERT_RATE_PER_CHAT,
+        burst=config.ALERT_BURST,
+        max_attempts=config.ALERT_MAX_ATTEMPTS
+    )
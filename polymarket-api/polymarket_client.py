@@ -4,13 +4,33 @@ Polymarket API Client for fetching markets and placing trades
 
 import httpx
 import asyncio
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Tuple, TYPE_CHECKING
 from config import config
-import json
+from metrics import (
+    upstream_latency, upstream_errors, cache_requests, request_upstream_seconds,
+    UPSTREAM_GAMMA_MARKETS, UPSTREAM_GAMMA_MARKET, UPSTREAM_GAMMA_EVENTS, UPSTREAM_GAMMA_TAGS,
+    UPSTREAM_CLOB_BOOK, UPSTREAM_CLOB_PRICE, UPSTREAM_CLOB_MIDPOINT
+)
+from models import Market, description_store
 
+# Label children are resolved once here so recording a sample on the hot
+# paths (per token, per upstream call) is a plain method call
+_UPSTREAM_ENDPOINTS = (
+    UPSTREAM_GAMMA_MARKETS, UPSTREAM_GAMMA_MARKET, UPSTREAM_GAMMA_EVENTS, UPSTREAM_GAMMA_TAGS,
+    UPSTREAM_CLOB_BOOK, UPSTREAM_CLOB_PRICE, UPSTREAM_CLOB_MIDPOINT
+)
+_upstream_latency = {e: upstream_latency.labels(e) for e in _UPSTREAM_ENDPOINTS}
+_upstream_errors = {e: upstream_errors.labels(e) for e in _UPSTREAM_ENDPOINTS}
+_market_hits = cache_requests.labels("market", "hit")
+_market_misses = cache_requests.labels("market", "miss")
+_price_hits = cache_requests.labels("price", "hit")
+_price_misses = cache_requests.labels("price", "miss")
+import json
 
-from py_clob_client.client import ClobClient
-from py_clob_client.constants import POLYGON
+if TYPE_CHECKING:
+    from py_clob_client.client import ClobClient
 
 class PolymarketClient:
     def __init__(self):
@@ -18,24 +38,107 @@ class PolymarketClient:
         self.clob_api = config.POLYMARKET_HOST
         self.http_client = None
         self.clob_client = None
+        # Set once the CLOB client failed to import/build; book calls then go straight to HTTP
+        self.clob_failed = False
+        
+        # market_id -> (market, fetched_at), oldest first; bounded by MARKET_CACHE_SIZE
+        self.market_cache: "OrderedDict[str, Tuple[Market, float]]" = OrderedDict()
+        # token_id -> market_id for the markets in market_cache
+        self.token_index: Dict[str, str] = {}
+        # token_id -> (midpoint, fetched_at), oldest first; bounded by PRICE_CACHE_SIZE
+        self.price_cache: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # token_id -> in-flight midpoint request, so concurrent callers share one fetch
+        self._inflight_prices: Dict[str, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_REQUESTS)
+        return self._semaphore
+    
+    def _cache_market(self, market_id: str, market: Market):
+        now = time.monotonic()
+        self.market_cache[market_id] = (market, now)
+        self.market_cache.move_to_end(market_id)
+        for token_id in market.token_ids():
+            self.token_index[token_id] = market_id
+        self._prune_markets(now, config.MARKET_CACHE_SIZE)
+    
+    def _cache_price(self, token_id: str, price: float):
+        now = time.monotonic()
+        self.price_cache[token_id] = (price, now)
+        self.price_cache.move_to_end(token_id)
+        self._prune_prices(now, config.PRICE_CACHE_SIZE)
+    
+    def _prune_markets(self, now: float, max_size: int):
+        """Drop expired markets (and anything over max_size) from the oldest end, with their tokens and descriptions"""
+        while self.market_cache:
+            market_id, (market, fetched_at) = next(iter(self.market_cache.items()))
+            if now - fetched_at < config.MARKET_CACHE_TTL and len(self.market_cache) <= max_size:
+                break
+            self.market_cache.popitem(last=False)
+            for token_id in market.token_ids():
+                if self.token_index.get(token_id) == market_id:
+                    del self.token_index[token_id]
+            description_store.discard(market_id)
+    
+    def _prune_prices(self, now: float, max_size: int):
+        while self.price_cache:
+            token_id, (_, fetched_at) = next(iter(self.price_cache.items()))
+            if now - fetched_at < config.PRICE_CACHE_TTL and len(self.price_cache) <= max_size:
+                break
+            self.price_cache.popitem(last=False)
+    
+    def prune(self):
+        """Drop expired cache entries; inserts already do this, so this is for idle periods"""
+        now = time.monotonic()
+        self._prune_markets(now, config.MARKET_CACHE_SIZE)
+        self._prune_prices(now, config.PRICE_CACHE_SIZE)
         
-    def _get_clob_client(self) -> ClobClient:
-        if not self.clob_client:
+    def _get_clob_client(self) -> Optional["ClobClient"]:
+        """Build the CLOB client on first use; importing it loads the web3/eth signing stack"""
+        if not self.clob_client and not self.clob_failed:
             try:
+                from py_clob_client.client import ClobClient
                 self.clob_client = ClobClient(
                     host=self.clob_api,
                     key=config.POLYMARKET_PRIVATE_KEY if config.POLYMARKET_PRIVATE_KEY else None,
                     chain_id=config.CHAIN_ID
                 )
             except Exception as e:
-                print(f"Failed to init ClobClient: {e}")
+                self.clob_failed = True
+                print(f"Failed to init ClobClient, using HTTP for order books: {e}")
         return self.clob_client
     
+    async def warm_clob(self) -> bool:
+        """Load the CLOB client off the event loop so the first book call doesn't pay for it"""
+        client = await asyncio.to_thread(self._get_clob_client)
+        return client is not None
+    
     async def _get_client(self) -> httpx.AsyncClient:
         if self.http_client is None:
             self.http_client = httpx.AsyncClient(timeout=30.0)
         return self.http_client
     
+    async def _timed_get(self, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        """GET against an upstream API, recording latency and failures per endpoint"""
+        client = await self._get_client()
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, **kwargs)
+        except Exception:
+            _upstream_errors[endpoint].inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _upstream_latency[endpoint].observe(elapsed)
+            spent = request_upstream_seconds.get()
+            if spent is not None:
+                spent[0] += elapsed
+        if response.status_code >= 400:
+            _upstream_errors[endpoint].inc()
+        return response
+    
     async def close(self):
         if self.http_client:
             await self.http_client.aclose()
@@ -43,9 +146,9 @@ class PolymarketClient:
     
     async def get_all_markets(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """Fetch all markets from Gamma API"""
-        client = await self._get_client()
         try:
-            response = await client.get(
+            response = await self._timed_get(
+                UPSTREAM_GAMMA_MARKETS,
                 f"{self.gamma_api}/markets",
                 params={
                     "limit": limit,
@@ -60,10 +163,36 @@ class PolymarketClient:
             print(f"Error fetching markets: {e}")
             return []
     
+    async def get_tags_page(self, limit: int = 100, offset: int = 0) -> Optional[List[Dict]]:
+        """One page of Gamma /tags; None if the request failed"""
+        try:
+            response = await self._timed_get(
+                UPSTREAM_GAMMA_TAGS,
+                f"{self.gamma_api}/tags",
+                params={"limit": limit, "offset": offset}
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error fetching tags: {e}")
+            return None
+    
+    async def get_events_page(self, limit: int = 100, offset: int = 0, **params) -> Optional[List[Dict]]:
+        """One page of raw Gamma /events (extra filters passed through); None if the request failed"""
+        try:
+            response = await self._timed_get(
+                UPSTREAM_GAMMA_EVENTS,
+                f"{self.gamma_api}/events",
+                params={"limit": limit, "offset": offset, **params}
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error fetching events: {e}")
+            return None
+    
     async def get_sports_markets(self, limit: int = 20, offset: int = 0) -> Dict:
         """Fetch sports-related markets using tag slugs"""
-        client = await self._get_client()
-        
         # Priority sports slugs to fetch
         # We rotate or fetch all. For pagination simplicity in this demo,
         # we will fetch 'sports' tag + specific high volume ones if 'sports' is empty.
@@ -83,7 +212,8 @@ class PolymarketClient:
             # For now, fetching "sports" tag_slug is the best broad approach.
             
             # Note: Gamma API offset is record-based.
-            response = await client.get(
+            response = await self._timed_get(
+                UPSTREAM_GAMMA_EVENTS,
                 f"{self.gamma_api}/events",
                 params={
                     "limit": limit,
@@ -99,26 +229,14 @@ class PolymarketClient:
                 
                 # If 'sports' tag is empty (sometimes happens), try 'nba' as fallback for demo
                 if not events and offset == 0:
-                     response = await client.get(
+                     response = await self._timed_get(
+                        UPSTREAM_GAMMA_EVENTS,
                         f"{self.gamma_api}/events",
                         params={"limit": limit, "tag_slug": "nba", "active": "true"}
                     )
                      events = response.json() if response.status_code == 200 else []
 
-                # Flatten events into markets
-                # Events usually contain multiple markets. We want the main ones (Winner, etc).
-                for event in events:
-                    event_markets = event.get("markets", [])
-                    event_title = event.get("title", "")
-                    event_img = event.get("image", "")
-                    
-                    for market in event_markets:
-                        # Enrich market with event metadata if missing
-                        if not market.get("image"):
-                            market["image"] = event_img
-                            
-                        # Add to list
-                        found_markets.append(market)
+                found_markets = self._markets_from_events(events)
                         
             # Normalize list length to limit
             return {
@@ -158,39 +276,129 @@ class PolymarketClient:
         
         return sports_markets
     
-    async def get_market_by_id(self, market_id: str) -> Optional[Dict]:
+    def _markets_from_events(self, events: List[Dict], cache: bool = True) -> List[Market]:
+        """Flatten Gamma events into markets, filling in the event image where a market has none"""
+        markets = []
+        for event in events:
+            event_img = event.get("image", "")
+            
+            for market in event.get("markets", []):
+                if not market.get("image"):
+                    market["image"] = event_img
+                
+                parsed = Market.from_gamma(market)
+                if parsed.id and cache:
+                    self._cache_market(parsed.id, parsed)
+                markets.append(parsed)
+        
+        return markets
+    
+    async def iter_sports_markets(self, page_size: int = 100) -> AsyncIterator[List[Market]]:
+        """
+        Walk every open sports event page by page. The next page is requested
+        as soon as the current one arrives, so it downloads while the caller
+        works on this one. Markets are not added to the market cache.
+        """
+        params = {"tag_slug": "sports", "active": "true", "closed": "false"}
+        offset = 0
+        next_page: Optional[asyncio.Task] = asyncio.create_task(self.get_events_page(page_size, offset, **params))
+        
+        try:
+            while next_page is not None:
+                events = await next_page
+                next_page = None
+                if events is None:
+                    raise RuntimeError(f"Events page at offset {offset} failed")
+                
+                if len(events) == page_size:
+                    offset += page_size
+                    next_page = asyncio.create_task(self.get_events_page(page_size, offset, **params))
+                
+                if events:
+                    yield self._markets_from_events(events, cache=False)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+    
+    async def get_market_by_id(self, market_id: str) -> Optional[Market]:
         """Fetch a specific market by ID"""
-        client = await self._get_client()
         try:
-            response = await client.get(f"{self.gamma_api}/markets/{market_id}")
+            response = await self._timed_get(UPSTREAM_GAMMA_MARKET, f"{self.gamma_api}/markets/{market_id}")
             response.raise_for_status()
-            return response.json()
+            market = Market.from_gamma(response.json())
+            self._cache_market(market_id, market)
+            return market
         except Exception as e:
             print(f"Error fetching market {market_id}: {e}")
             return None
     
+    def evict_market(self, market_id: str, token_ids: Iterable[str] = ()):
+        """Drop a market, its token index entries and cached prices"""
+        entry = self.market_cache.pop(market_id, None)
+        if entry:
+            token_ids = list(token_ids) + entry[0].token_ids()
+        for token_id in token_ids:
+            self.token_index.pop(token_id, None)
+            self.price_cache.pop(token_id, None)
+        description_store.discard(market_id)
+    
+    def get_cached_market(self, market_id: str) -> Optional[Market]:
+        """Return a market from cache if it is still fresh"""
+        entry = self.market_cache.get(market_id)
+        if entry and time.monotonic() - entry[1] < config.MARKET_CACHE_TTL:
+            _market_hits.inc()
+            return entry[0]
+        _market_misses.inc()
+        return None
+    
+    async def get_markets_by_ids(self, market_ids: Iterable[str], fresh: bool = False) -> Dict[str, Market]:
+        """Resolve many markets, serving from cache (unless fresh) and fetching the rest concurrently"""
+        found: Dict[str, Market] = {}
+        missing = []
+        
+        for market_id in dict.fromkeys(market_ids):
+            market = None if fresh else self.get_cached_market(market_id)
+            if market is not None:
+                found[market_id] = market
+            else:
+                missing.append(market_id)
+        
+        async def fetch(market_id: str):
+            async with self._get_semaphore():
+                return market_id, await self.get_market_by_id(market_id)
+        
+        for market_id, market in await asyncio.gather(*(fetch(m) for m in missing)):
+            if market:
+                found[market_id] = market
+        
+        return found
+    
     async def get_market_orderbook(self, token_id: str) -> Dict:
         """Fetch orderbook for a specific token using ClobClient"""
         try:
-            client = self._get_clob_client()
+            client = self.clob_client
+            if client is None and not self.clob_failed:
+                client = await asyncio.to_thread(self._get_clob_client)
             if client:
-                # ClobClient relies on sync requests in the current version or we wrap it
-                # The library doesn't seem to be async native for requests, so we might block slightly 
-                # or we should run it in an executor if high traffic. 
-                # For now direct call:
-                book = client.get_order_book(token_id)
+                # ClobClient uses blocking requests; keep the call off the event loop
+                start = time.perf_counter()
+                try:
+                    book = await asyncio.to_thread(client.get_order_book, token_id)
+                finally:
+                    _upstream_latency[UPSTREAM_CLOB_BOOK].observe(time.perf_counter() - start)
                 # book usually returns an object with bids/asks
                 return {
                     "bids": [{"price": b.price, "size": b.size} for b in book.bids],
                     "asks": [{"price": a.price, "size": a.size} for a in book.asks]
                 }
         except Exception as e:
+            _upstream_errors[UPSTREAM_CLOB_BOOK].inc()
             print(f"Error fetching orderbook via CLOB: {e}")
         
         # Fallback to direct HTTP if CLOB library fails
-        client = await self._get_client()
         try:
-            response = await client.get(
+            response = await self._timed_get(
+                UPSTREAM_CLOB_BOOK,
                 f"{self.clob_api}/book",
                 params={"token_id": token_id}
             )
@@ -202,9 +410,9 @@ class PolymarketClient:
     
     async def get_market_price(self, token_id: str) -> Optional[Dict]:
         """Get current price for a token"""
-        client = await self._get_client()
         try:
-            response = await client.get(
+            response = await self._timed_get(
+                UPSTREAM_CLOB_PRICE,
                 f"{self.clob_api}/price",
                 params={"token_id": token_id, "side": "buy"}
             )
@@ -216,9 +424,9 @@ class PolymarketClient:
     
     async def get_midpoint_price(self, token_id: str) -> Optional[float]:
         """Get midpoint price for a token"""
-        client = await self._get_client()
         try:
-            response = await client.get(
+            response = await self._timed_get(
+                UPSTREAM_CLOB_MIDPOINT,
                 f"{self.clob_api}/midpoint",
                 params={"token_id": token_id}
             )
@@ -229,17 +437,117 @@ class PolymarketClient:
             print(f"Error fetching midpoint: {e}")
             return None
     
-    async def get_prices_for_market(self, market: Dict) -> Dict:
+    async def _fetch_midpoint(self, token_id: str) -> Optional[float]:
+        async with self._get_semaphore():
+            return await self.get_midpoint_price(token_id)
+    
+    def prices_fetched_at(self, token_ids: Iterable[str]) -> Optional[float]:
+        """Monotonic fetch time of the oldest cached price among these tokens"""
+        times = [entry[1] for entry in map(self.price_cache.get, token_ids) if entry]
+        return min(times, default=None)
+    
+    async def get_midpoints(self, token_ids: Iterable[str], cache: bool = True) -> Dict[str, Optional[float]]:
+        """
+        Midpoints for many tokens in one fan-out. Fresh cached prices are
+        reused, duplicates are collapsed and tokens already being fetched by
+        another caller share that request. With cache=False (one-off walks
+        like the catalog stream) fetched prices are not added to the cache.
+        """
+        now = time.monotonic()
+        results: Dict[str, Optional[float]] = {}
+        pending: Dict[str, asyncio.Future] = {}
+        
+        for token_id in dict.fromkeys(token_ids):
+            entry = self.price_cache.get(token_id)
+            if entry and now - entry[1] < config.PRICE_CACHE_TTL:
+                _price_hits.inc()
+                results[token_id] = entry[0]
+                continue
+            _price_misses.inc()
+            
+            future = self._inflight_prices.get(token_id)
+            if future is None:
+                future = asyncio.ensure_future(self._fetch_midpoint(token_id))
+                self._inflight_prices[token_id] = future
+                future.add_done_callback(
+                    lambda _, t=token_id: self._inflight_prices.pop(t, None)
+                )
+            pending[token_id] = future
+        
+        if pending:
+            # shield: a cancelled caller must not cancel fetches other callers share
+            fetched = await asyncio.gather(
+                *(asyncio.shield(future) for future in pending.values()),
+                return_exceptions=True
+            )
+            for token_id, price in zip(pending, fetched):
+                price = None if isinstance(price, BaseException) else price
+                results[token_id] = price
+                if cache and price is not None:
+                    self._cache_price(token_id, price)
+        
+        return results
+    
+    async def get_batch_prices(self, market_ids: List[str], token_ids: List[str]) -> Dict:
+        """
+        Prices for many markets and tokens in one columnar response.
+        Each row is one outcome token.
+        """
+        markets = await self.get_markets_by_ids(market_ids)
+        
+        rows: Dict[str, Tuple[Optional[str], str]] = {}
+        for market_id, market in markets.items():
+            for outcome in market.outcomes:
+                if outcome.token_id:
+                    rows[outcome.token_id] = (market_id, outcome.name)
+        
+        for token_id in token_ids:
+            if token_id in rows:
+                continue
+            market_id = self.token_index.get(token_id)
+            market = self.get_cached_market(market_id) if market_id else None
+            outcome = market.outcome_for_token(token_id) if market else None
+            rows[token_id] = (market_id, outcome.name if outcome else "Unknown")
+        
+        prices = await self.get_midpoints(rows.keys())
+        
+        columns = {
+            "token_id": [],
+            "market_id": [],
+            "outcome": [],
+            "probability": [],
+            "decimal_odds": []
+        }
+        
+        for token_id, (market_id, outcome) in rows.items():
+            price = prices.get(token_id)
+            columns["token_id"].append(token_id)
+            columns["market_id"].append(market_id)
+            columns["outcome"].append(outcome)
+            columns["probability"].append(price)
+            columns["decimal_odds"].append(round(1 / price, 2) if price else None)
+        
+        return {
+            "count": len(rows),
+            "columns": columns,
+            "missing_markets": [m for m in dict.fromkeys(market_ids) if m not in markets]
+        }
+    
+    async def get_prices_for_market(self, market: Market) -> Dict:
         """Get prices for all outcomes in a market"""
-        tokens = market.get("tokens", [])
+        midpoints = await self.get_midpoints(market.token_ids())
+        return self.format_prices(market, midpoints)
+    
+    def format_prices(self, market: Market, midpoints: Dict[str, Optional[float]]) -> Dict:
+        """Outcome name -> {token_id, probability, decimal_odds} from already fetched midpoints"""
         prices = {}
         
-        for token in tokens:
-            token_id = token.get("token_id")
-            outcome = token.get("outcome", "Unknown")
+        for token in market.outcomes:
+            token_id = token.token_id
+            outcome = token.name
             
             if token_id:
-                price = await self.get_midpoint_price(token_id)
+                price = midpoints.get(token_id)
                 if price:
                     # Convert probability to decimal odds
                     if price > 0:
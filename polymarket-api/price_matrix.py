@@ -0,0 +1,345 @@
+"""
+Shared-memory price matrix and arbitrage worker pool
+
+The feed (poller, orderbook fetches, venue odds) owns a fixed-layout matrix
+in multiprocessing.shared_memory: one row of float64 fields per token slot,
+guarded by a per-row seqlock version counter. Worker processes attach to the
+same block and read rows zero-copy, so arbitrage evaluation and sizing run
+on other cores without pickling price dicts across a pipe. Only the small
+(market_id, slot_a, slot_b) pair list goes to the workers, and only found
+opportunities come back.
+
+Each source (poller mid, top of book, venue odds) has its own timestamp in
+the row, and quotes older than the evaluation's max age are ignored. A
+Polymarket leg is only sized from a real best ask with its size. When only
+the mid is known the opportunity is reported as indicative, without stakes.
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from arbitrage import calculate, calculate_stakes, max_investment
+
+# Row fields
+MID = 0
+BID = 1
+ASK = 2
+ASK_SIZE = 3
+VENUE_ODDS = 4  # decimal odds for the same outcome on the other venue
+MID_AT = 5      # unix time of the latest write per source
+BOOK_AT = 6
+VENUE_AT = 7
+NUM_FIELDS = 8
+
+NAN = float("nan")
+
+Pair = Tuple[str, int, int]
+
+
+class PriceMatrix:
+    def __init__(self, capacity: int, name: Optional[str] = None, create: bool = True):
+        self.capacity = capacity
+        self.owner = create
+        size = capacity * 8 * (1 + NUM_FIELDS)
+
+        if create:
+            self.shm = SharedMemory(name=name, create=True, size=size)
+        else:
+            # Workers are started by the owner and share its resource tracker,
+            # so the block is unlinked exactly once, by the owner's close()
+            self.shm = SharedMemory(name=name)
+
+        self.name = self.shm.name
+        self.versions = self.shm.buf[:capacity * 8].cast("Q")
+        self.values = self.shm.buf[capacity * 8:size].cast("d")
+
+        # Owner-side bookkeeping
+        self.slots: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.market_pairs: Dict[str, Tuple[int, int]] = {}
+        self.market_tokens: Dict[str, Tuple[str, ...]] = {}
+
+        if create:
+            for i in range(capacity * NUM_FIELDS):
+                self.values[i] = NAN
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "PriceMatrix":
+        return cls(capacity, name=name, create=False)
+
+    # Owner API
+
+    def slot_for(self, token_id: str) -> int:
+        slot = self.slots.get(token_id)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            elif len(self.slots) < self.capacity:
+                slot = len(self.slots)
+            else:
+                raise ValueError("Price matrix is full")
+            self.slots[token_id] = slot
+        return slot
+
+    def release(self, token_id: str):
+        """Return a token's slot to the free list and clear its row"""
+        slot = self.slots.pop(token_id, None)
+        if slot is None:
+            return
+        self.write(slot, {f: NAN for f in range(NUM_FIELDS)})
+        self.free_slots.append(slot)
+
+    def release_market(self, market_id: str, token_ids: Sequence[str] = ()):
+        """Stop evaluating a market and free its tokens' slots"""
+        self.market_pairs.pop(market_id, None)
+        for token_id in set(token_ids) | set(self.market_tokens.pop(market_id, ())):
+            self.release(token_id)
+
+    def write(self, slot: int, fields: Dict[int, float]):
+        """Seqlock write: version is odd while the row is being updated"""
+        version = self.versions[slot]
+        self.versions[slot] = version + 1
+        base = slot * NUM_FIELDS
+        for field, value in fields.items():
+            self.values[base + field] = value
+        self.versions[slot] = version + 2
+
+    def update_token(self, token_id: str, updated_at: float, **fields: Optional[float]) -> int:
+        """
+        Write named fields (mid, bid, ask, ask_size, venue_odds) for a token
+        and stamp their source. None clears a field (e.g. a book with no asks).
+        """
+        slot = self.slot_for(token_id)
+        row = {}
+        for key, value in fields.items():
+            field = _FIELD_NAMES[key]
+            row[field] = NAN if value is None else float(value)
+            row[_FIELD_TIMES[field]] = updated_at
+        self.write(slot, row)
+        return slot
+
+    def ingest(self, update: Dict, updated_at: float):
+        """Write a poller price update and register two-outcome markets for evaluation"""
+        slots = []
+        token_ids = []
+        for price_data in update.get("prices", {}).values():
+            token_id = price_data.get("token_id")
+            probability = price_data.get("probability")
+            if token_id and probability is not None:
+                slots.append(self.update_token(token_id, updated_at, mid=probability))
+                token_ids.append(token_id)
+
+        market_id = update["market_id"]
+        self.market_tokens[market_id] = tuple(set(self.market_tokens.get(market_id, ())) | set(token_ids))
+        if len(slots) == 2:
+            self.market_pairs[market_id] = (slots[0], slots[1])
+
+    def pairs(self) -> List[Pair]:
+        return [(market_id, a, b) for market_id, (a, b) in self.market_pairs.items()]
+
+    # Reader API (any process)
+
+    def read(self, slot: int) -> Tuple[float, ...]:
+        """Seqlock read: retry until the row was not written during the copy"""
+        base = slot * NUM_FIELDS
+        while True:
+            before = self.versions[slot]
+            if before & 1:
+                continue
+            row = tuple(self.values[base:base + NUM_FIELDS])
+            if self.versions[slot] == before:
+                return row
+
+    def close(self):
+        self.versions.release()
+        self.values.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+_FIELD_NAMES = {
+    "mid": MID,
+    "bid": BID,
+    "ask": ASK,
+    "ask_size": ASK_SIZE,
+    "venue_odds": VENUE_ODDS
+}
+
+# Timestamp field stamped when a field is written
+_FIELD_TIMES = {
+    MID: MID_AT,
+    BID: BOOK_AT,
+    ASK: BOOK_AT,
+    ASK_SIZE: BOOK_AT,
+    VENUE_ODDS: VENUE_AT
+}
+
+
+class _Leg:
+    __slots__ = ("odds", "depth", "indicative", "quoted_at")
+
+    def __init__(self, odds: float, depth: float, indicative: bool, quoted_at: float):
+        self.odds = odds
+        self.depth = depth
+        self.indicative = indicative
+        self.quoted_at = quoted_at
+
+
+def _valid(value: float) -> bool:
+    return not math.isnan(value) and value > 0
+
+
+def _fresh(row: Sequence[float], field: int, now: Optional[float], max_age: Optional[float]) -> bool:
+    # NaN timestamps (never written) compare False, so they are never fresh
+    return now is None or max_age is None or now - row[field] <= max_age
+
+
+def _poly_leg(row: Sequence[float], now: Optional[float], max_age: Optional[float]) -> Optional[_Leg]:
+    """
+    Buying this outcome on Polymarket: at the best ask, up to its size, or
+    indicatively at the mid (no executable size) when there is no fresh ask
+    """
+    if _valid(row[ASK]) and row[ASK] < 1 and _valid(row[ASK_SIZE]) and _fresh(row, BOOK_AT, now, max_age):
+        return _Leg(1 / row[ASK], row[ASK_SIZE] * row[ASK], False, row[BOOK_AT])
+    if _valid(row[MID]) and row[MID] < 1 and _fresh(row, MID_AT, now, max_age):
+        return _Leg(1 / row[MID], 0.0, True, row[MID_AT])
+    return None
+
+
+def _venue_leg(row: Sequence[float], now: Optional[float], max_age: Optional[float]) -> Optional[_Leg]:
+    """Backing the outcome on the other venue; its depth is not known here"""
+    if _valid(row[VENUE_ODDS]) and _fresh(row, VENUE_AT, now, max_age):
+        return _Leg(row[VENUE_ODDS], math.inf, False, row[VENUE_AT])
+    return None
+
+
+def evaluate_pair(matrix: PriceMatrix, pair: Pair, total_stake: float,
+                  now: Optional[float] = None, max_age: Optional[float] = None) -> List[Dict]:
+    market_id, slot_a, slot_b = pair
+    return evaluate_rows(market_id, matrix.read(slot_a), matrix.read(slot_b), total_stake, now, max_age)
+
+
+def evaluate_rows(market_id: str, row_a: Sequence[float], row_b: Sequence[float],
+                  total_stake: float, now: Optional[float] = None,
+                  max_age: Optional[float] = None) -> List[Dict]:
+    """
+    Check both outcomes of a market against each other and against the
+    venue. Quotes older than max_age seconds at `now` are ignored (no
+    freshness check when either is None). Indicative opportunities (a
+    Polymarket leg priced from the mid) have no max_investment or stakes.
+    """
+    poly_a = _poly_leg(row_a, now, max_age)
+    poly_b = _poly_leg(row_b, now, max_age)
+    venue_a = _venue_leg(row_a, now, max_age)
+    venue_b = _venue_leg(row_b, now, max_age)
+
+    legs = (
+        ("poly_both", poly_a, poly_b),
+        ("poly_a_venue_b", poly_a, venue_b),
+        ("venue_a_poly_b", venue_a, poly_b)
+    )
+
+    opportunities = []
+    for kind, leg1, leg2 in legs:
+        if leg1 is None or leg2 is None:
+            continue
+        arb = calculate(leg1.odds, leg2.odds)
+        if not arb["is_arb"]:
+            continue
+
+        indicative = leg1.indicative or leg2.indicative
+        investment = None
+        if not indicative:
+            investment = min(total_stake, max_investment(leg1.odds, leg2.odds, leg1.depth, leg2.depth))
+
+        opportunities.append({
+            "market_id": market_id,
+            "type": kind,
+            "odds": [round(leg1.odds, 4), round(leg2.odds, 4)],
+            "roi": arb["roi"],
+            "indicative": indicative,
+            "max_investment": None if investment is None else round(investment, 2),
+            "stakes": None if investment is None else calculate_stakes(investment, leg1.odds, leg2.odds),
+            # Time of the oldest quote used
+            "updated_at": min(leg1.quoted_at, leg2.quoted_at)
+        })
+
+    return opportunities
+
+
+# Worker process side
+
+_worker_matrix: Optional[PriceMatrix] = None
+
+
+def _init_worker(name: str, capacity: int):
+    global _worker_matrix
+    _worker_matrix = PriceMatrix.attach(name, capacity)
+
+
+def _evaluate_chunk(pairs: List[Pair], total_stake: float, now: Optional[float] = None,
+                    max_age: Optional[float] = None) -> List[Dict]:
+    results = []
+    for pair in pairs:
+        results.extend(evaluate_pair(_worker_matrix, pair, total_stake, now, max_age))
+    return results
+
+
+class ArbWorkerPool:
+    """Evaluates market pairs across worker processes reading the shared matrix"""
+
+    def __init__(self, matrix: PriceMatrix, processes: int, chunk_size: int = 256):
+        self.matrix = matrix
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if processes > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(matrix.name, matrix.capacity)
+            )
+
+    async def warm(self) -> bool:
+        """Start every worker process (spawn + attach) ahead of the first evaluation"""
+        if self.executor is None:
+            return True
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, _evaluate_chunk, [], 0.0)
+            for _ in range(self.processes)
+        ))
+        return True
+
+    async def evaluate(self, total_stake: float, max_age: Optional[float] = None) -> List[Dict]:
+        """Opportunities across all registered pairs, ignoring quotes older than max_age seconds"""
+        pairs = self.matrix.pairs()
+        now = time.time()
+
+        if self.executor is None:
+            # No workers configured: evaluate on the loop
+            results = []
+            for pair in pairs:
+                results.extend(evaluate_pair(self.matrix, pair, total_stake, now, max_age))
+            return results
+
+        loop = asyncio.get_running_loop()
+        chunks = [pairs[i:i + self.chunk_size] for i in range(0, len(pairs), self.chunk_size)]
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, _evaluate_chunk, chunk, total_stake, now, max_age)
+            for chunk in chunks
+        ))
+        return [opportunity for chunk in chunk_results for opportunity in chunk]
+
+    def shutdown(self):
+        """Cancel queued chunks and wait for the workers to exit, so the matrix can be unlinked after"""
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
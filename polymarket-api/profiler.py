@@ -0,0 +1,150 @@
+"""
+Event-loop lag monitoring and on-demand sampling profiles
+
+LoopMonitor is always on. A coroutine wakes every `interval` seconds and
+records how late it ran (loop lag). A watchdog thread watches that
+heartbeat. When the loop has not come back for `threshold` seconds, the
+watchdog captures the loop thread's stack, which shows what is holding the
+loop, and keeps it in a short ring of slow-callback records.
+
+sample_profile() is a sampling profiler for live servers. A background
+thread reads sys._current_frames() every few milliseconds and counts stacks
+in collapsed format ("frame;frame;frame count"), ready for flamegraph.pl or
+speedscope. Nothing is instrumented and the profiled code is not traced;
+the cost is one stack walk per sample.
+"""
+
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from typing import Deque, Dict, List, Optional
+
+from metrics import loop_lag_seconds
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, keep: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.slow: Deque[Dict] = collections.deque(maxlen=keep)
+
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # Slow-callback record being filled while the loop is still blocked
+        self._current: Optional[Dict] = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            loop_lag_seconds.observe(lag)
+            self._heartbeat = now
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            current = self._current
+
+            if blocked < self.threshold:
+                if current is not None:
+                    # The loop came back; close the record with the final duration
+                    current["blocked_s"] = round(current["blocked_s"], 3)
+                    self._current = None
+                continue
+
+            if current is not None:
+                current["blocked_s"] = blocked
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._current = {
+                "at": time.time(),
+                "blocked_s": blocked,
+                "stack": traceback.format_stack(frame)
+            }
+            self.slow.append(self._current)
+            print(f"[Profiler] Event loop blocked >{self.threshold}s in {_frame_name(frame)}")
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._beat())
+        self._stopped.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "interval_s": self.interval,
+            "threshold_s": self.threshold,
+            "last_lag_s": round(self.last_lag, 4),
+            "max_lag_s": round(self.max_lag, 4),
+            "slow_callbacks": [
+                {**record, "blocked_s": round(record["blocked_s"], 3)} for record in list(self.slow)
+            ]
+        }
+
+
+_profile_lock = threading.Lock()
+
+
+def sample_profile(seconds: float, interval: float = 0.005, thread_id: Optional[int] = None) -> Optional[str]:
+    """
+    Sample stacks for `seconds` and return collapsed stacks, one line each.
+    Runs on the calling thread (use asyncio.to_thread); returns None if
+    another profile is already running. Samples every thread except this
+    one, or only `thread_id`.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+
+    try:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        counts: Dict[str, int] = collections.Counter()
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (thread_id is not None and ident != thread_id):
+                    continue
+                counts[f"{names.get(ident, ident)};{_collapse(frame)}"] += 1
+            time.sleep(interval)
+
+        lines: List[str] = [f"{stack} {count}" for stack, count in counts.items()]
+        return "\n".join(sorted(lines)) + "\n"
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,151 @@
+"""
+Serialized response cache with ETags and pre-compressed bodies
+
+Polling clients hit the same catalog/market/orderbook URLs over and over.
+Responses are serialized once per TTL window and keyed by route parameters.
+The ETag is a hash of the serialized body, so an unchanged payload answers
+If-None-Match with 304 even after the entry has been rebuilt. Compressed
+variants are produced on first request for that encoding and reused.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from config import config
+from metrics import cache_requests
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "created_at", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.created_at = time.monotonic()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == "br":
+                body = brotli.compress(self.body, quality=5)
+            else:
+                body = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = body
+        return body
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [t.strip() for t in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if part.strip() and not part.strip().endswith("q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._hits = cache_requests.labels("response", "hit")
+        self._misses = cache_requests.labels("response", "miss")
+        # key -> in-flight build, so concurrent misses serialize once
+        self._building: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable, ttl: float) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry.created_at >= ttl:
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, payload: Any) -> CachedResponse:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        entry = CachedResponse(body)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    async def _build_and_store(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        return self.put(key, await build())
+
+    async def _build_once(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        future = self._building.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._build_and_store(key, build))
+            self._building[key] = future
+            future.add_done_callback(lambda _: self._building.pop(key, None))
+        # shield: one waiter disconnecting must not cancel the shared build
+        return await asyncio.shield(future)
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        ttl: float,
+        build: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """
+        Serve `key` from cache or build it, honouring If-None-Match and
+        Accept-Encoding. Exceptions from `build` propagate and nothing is cached.
+        """
+        entry = self.get(key, ttl)
+        if entry is None:
+            self._misses.inc()
+            entry = await self._build_once(key, build)
+        else:
+            self._hits.inc()
+
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        if len(body) >= config.COMPRESS_MIN_BYTES:
+            encoding = _pick_encoding(request.headers.get("accept-encoding", ""))
+            if encoding:
+                body = entry.encoded(encoding)
+                headers["Content-Encoding"] = encoding
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Singleton instance
+response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE)
@@ -0,0 +1,68 @@
+import time
+
+from allocator import allocate
+
+
+def opportunity(market_id, roi, max_investment, kind="poly_a_venue_b", odds=(2.1, 2.1), **extra):
+    return {
+        "market_id": market_id,
+        "type": kind,
+        "odds": list(odds),
+        "roi": roi,
+        "indicative": False,
+        "max_investment": max_investment,
+        "updated_at": time.time(),
+        **extra
+    }
+
+
+def invested_by_market(result):
+    return {a["market_id"]: a["investment"] for a in result["allocations"]}
+
+
+def test_highest_roi_first_within_free_payroll():
+    result = allocate([opportunity("a", 2, 500), opportunity("b", 5, 300)], payroll=600, blocked=100)
+    assert invested_by_market(result) == {"b": 300, "a": 200}
+    assert result["free_after"] == 0
+
+
+def test_one_position_per_market():
+    result = allocate([opportunity("a", 2, 100), opportunity("a", 4, 100, kind="poly_both")], payroll=1000)
+    assert len(result["allocations"]) == 1
+    assert result["allocations"][0]["type"] == "poly_both"
+
+
+def test_caps_by_depth_and_max_stake():
+    result = allocate([opportunity("a", 5, 80), opportunity("b", 4, 500)], payroll=1000, max_stake=150)
+    assert invested_by_market(result) == {"a": 80, "b": 150}
+
+
+def test_venue_balances_limit_each_leg():
+    # Even odds: half of each investment is spent on each venue
+    result = allocate([opportunity("a", 5, 1000, odds=(2.0, 2.0))], payroll=1000, balances={"venue": 100})
+    assert invested_by_market(result) == {"a": 200}
+    assert result["balances_after"] == {"venue": 0}
+
+
+def test_trade_limit_picks_largest_profit():
+    opportunities = [opportunity("small", 10, 20), opportunity("big", 3, 1000)]
+    result = allocate(opportunities, payroll=1000, max_trades=1)
+    assert invested_by_market(result) == {"big": 1000}
+
+
+def test_indicative_and_stale_opportunities_are_not_funded():
+    now = time.time()
+    opportunities = [
+        opportunity("mid", 20, None, kind="poly_both", indicative=True),
+        opportunity("stale", 10, 500, updated_at=now - 120),
+        opportunity("fresh", 1, 50)
+    ]
+    result = allocate(opportunities, payroll=1000, now=now, max_age=30)
+    assert invested_by_market(result) == {"fresh": 50}
+    assert result["skipped_indicative"] == 1
+    assert result["skipped_stale"] == 1
+
+
+def test_below_min_stake_is_skipped():
+    result = allocate([opportunity("a", 5, 0.5)], payroll=1000, min_stake=1)
+    assert result["allocations"] == []
@@ -0,0 +1,122 @@
+import asyncio
+
+from notifications import AlertDispatcher, AlertJournal, SendError, StubSink
+
+CHAT = "chat"
+
+
+def dispatcher(sink, journal=None, **kwargs):
+    # Built inside a running loop: the dispatcher owns an asyncio.Event
+    return AlertDispatcher(sink, journal, **kwargs)
+
+
+def test_same_key_is_deduplicated_before_send():
+    async def scenario():
+        sink = StubSink()
+        d = dispatcher(sink)
+        d.submit("arb-1", "first", CHAT)
+        d.submit("arb-1", "second", CHAT)
+        await d._drain_chat(CHAT)
+        return sink, d
+
+    sink, d = asyncio.run(scenario())
+    assert sink.sent == [(CHAT, "second")]
+    assert d.stats()["suppressed"] == 1
+
+
+def test_cooldown_drops_repeats_after_send():
+    async def scenario():
+        d = dispatcher(StubSink(), cooldown=60)
+        d.submit("arb-1", "first", CHAT)
+        await d._drain_chat(CHAT)
+        return d.submit("arb-1", "again", CHAT), d.submit("arb-2", "other", CHAT)
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_burst_is_coalesced_into_one_digest():
+    async def scenario():
+        sink = StubSink()
+        d = dispatcher(sink, rate=0.01, burst=1)
+        for i in range(3):
+            d.submit(f"arb-{i}", f"opportunity {i}", CHAT)
+        await d._drain_chat(CHAT)
+        return sink, d
+
+    sink, d = asyncio.run(scenario())
+    assert len(sink.sent) == 1
+    text = sink.sent[0][1]
+    assert text.startswith("3 arbitrage opportunities")
+    assert all(f"opportunity {i}" in text for i in range(3))
+    assert d.stats()["coalesced"] == 3
+
+
+def test_permanent_failure_is_dead_lettered():
+    async def scenario():
+        journal = AlertJournal(":memory:")
+        d = dispatcher(StubSink([SendError("chat not found", permanent=True)]), journal)
+        d.submit("arb-1", "text", CHAT)
+        await d._drain_chat(CHAT)
+        journal.commit()
+        return journal, d
+
+    journal, d = asyncio.run(scenario())
+    assert journal.pending() == []
+    assert journal.db.execute("SELECT key, error FROM dead_letters").fetchall() == [("arb-1", "chat not found")]
+    assert d.stats()["dead_lettered"] == 1
+    assert not d.pending.get(CHAT)
+
+
+def test_transient_failure_backs_off_then_dead_letters_at_max_attempts():
+    async def scenario():
+        journal = AlertJournal(":memory:")
+        sink = StubSink([SendError("502"), SendError("502")])
+        d = dispatcher(sink, journal, rate=1.0, max_attempts=2)
+        d.submit("arb-1", "text", CHAT)
+
+        delay = await d._drain_chat(CHAT)
+        requeued = list(d.pending[CHAT])
+        d.retry_at[CHAT] = 0.0  # skip the backoff
+        await d._drain_chat(CHAT)
+        return delay, requeued, journal, d
+
+    delay, requeued, journal, d = asyncio.run(scenario())
+    assert delay >= 1.0
+    assert requeued == ["arb-1"]
+    assert d.stats()["dead_lettered"] == 1
+    assert journal.db.execute("SELECT attempts FROM dead_letters").fetchall() == [(2,)]
+
+
+def test_rate_limit_waits_retry_after_without_costing_an_attempt():
+    async def scenario():
+        sink = StubSink([SendError("429", retry_after=7)])
+        d = dispatcher(sink, max_attempts=1)
+        d.submit("arb-1", "text", CHAT)
+        delay = await d._drain_chat(CHAT)
+        blocked = await d._drain_chat(CHAT)
+        d.retry_at[CHAT] = 0.0
+        await d._drain_chat(CHAT)
+        return delay, blocked, sink, d
+
+    delay, blocked, sink, d = asyncio.run(scenario())
+    assert delay >= 7
+    assert blocked > 6
+    assert sink.sent == [(CHAT, "text")]
+    assert d.stats()["dead_lettered"] == 0
+
+
+def test_journaled_alerts_survive_a_restart():
+    async def scenario():
+        journal = AlertJournal(":memory:")
+        first = dispatcher(StubSink(), journal)
+        first.submit("arb-1", "text", CHAT)
+        journal.commit()
+
+        sink = StubSink()
+        second = dispatcher(sink, journal)
+        await second._drain_chat(CHAT)
+        return sink, journal
+
+    sink, journal = asyncio.run(scenario())
+    assert sink.sent == [(CHAT, "text")]
+    assert journal.pending() == []
@@ -0,0 +1,75 @@
+from price_matrix import (
+    ASK, ASK_SIZE, BOOK_AT, MID, MID_AT, NAN, NUM_FIELDS, VENUE_AT, VENUE_ODDS, evaluate_rows
+)
+
+NOW = 1_000_000.0
+
+
+def row(mid=None, ask=None, ask_size=None, venue=None, at=NOW):
+    values = [NAN] * NUM_FIELDS
+    if mid is not None:
+        values[MID] = mid
+        values[MID_AT] = at
+    if ask is not None:
+        values[ASK] = ask
+        values[ASK_SIZE] = ask_size
+        values[BOOK_AT] = at
+    if venue is not None:
+        values[VENUE_ODDS] = venue
+        values[VENUE_AT] = at
+    return values
+
+
+def by_type(opportunities):
+    return {o["type"]: o for o in opportunities}
+
+
+def test_mid_only_arb_is_indicative():
+    found = by_type(evaluate_rows("m", row(mid=0.45), row(mid=0.45), 100, NOW, 30))
+    arb = found["poly_both"]
+    assert arb["indicative"] is True
+    assert arb["max_investment"] is None
+    assert arb["stakes"] is None
+
+
+def test_ask_arb_is_sized_by_depth():
+    # 10 shares at 0.45 = 4.5 of depth on each leg
+    found = by_type(evaluate_rows("m", row(ask=0.45, ask_size=10), row(ask=0.45, ask_size=10), 100, NOW, 30))
+    arb = found["poly_both"]
+    assert arb["indicative"] is False
+    assert 0 < arb["max_investment"] <= 9.0
+    assert arb["stakes"] is not None
+    assert arb["updated_at"] == NOW
+
+
+def test_stake_caps_investment():
+    found = by_type(evaluate_rows(
+        "m", row(ask=0.45, ask_size=1000), row(ask=0.45, ask_size=1000), 50, NOW, 30
+    ))
+    assert found["poly_both"]["max_investment"] == 50
+
+
+def test_stale_quotes_are_ignored():
+    stale = NOW - 60
+    assert evaluate_rows("m", row(ask=0.45, ask_size=10, at=stale), row(ask=0.45, ask_size=10), 100, NOW, 30) == []
+    # Without a freshness window the same quotes still count
+    assert evaluate_rows("m", row(ask=0.45, ask_size=10, at=stale), row(ask=0.45, ask_size=10), 100)
+
+
+def test_stale_ask_falls_back_to_fresh_mid():
+    row_a = row(ask=0.45, ask_size=10, at=NOW - 60)
+    row_a[MID] = 0.45
+    row_a[MID_AT] = NOW
+    found = by_type(evaluate_rows("m", row_a, row(ask=0.45, ask_size=10), 100, NOW, 30))
+    assert found["poly_both"]["indicative"] is True
+
+
+def test_venue_leg_uses_poly_depth():
+    found = by_type(evaluate_rows("m", row(ask=0.45, ask_size=10), row(venue=2.2), 100, NOW, 30))
+    arb = found["poly_a_venue_b"]
+    assert arb["indicative"] is False
+    assert arb["max_investment"] is not None and arb["max_investment"] < 100
+
+
+def test_no_arb_without_edge():
+    assert evaluate_rows("m", row(ask=0.55, ask_size=10), row(ask=0.55, ask_size=10), 100, NOW, 30) == []
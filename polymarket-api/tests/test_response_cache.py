@@ -0,0 +1,102 @@
+import asyncio
+
+from fastapi import Request
+
+from response_cache import ResponseCache
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def test_etag_answers_if_none_match_with_304():
+    cache = ResponseCache()
+
+    async def build():
+        return {"markets": [1, 2, 3]}
+
+    async def scenario():
+        first = await cache.respond(make_request(), "k", 10, build)
+        etag = first.headers["etag"]
+        again = await cache.respond(make_request(if_none_match=etag), "k", 10, build)
+        other = await cache.respond(make_request(if_none_match='"other"'), "k", 10, build)
+        return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.body == b""
+    assert other.status_code == 200
+
+
+def test_rebuilt_identical_body_keeps_etag():
+    cache = ResponseCache()
+
+    async def build():
+        return {"price": 0.5}
+
+    async def scenario():
+        first = await cache.respond(make_request(), "k", 10, build)
+        cache.invalidate("k")
+        second = await cache.respond(make_request(if_none_match=first.headers["etag"]), "k", 10, build)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second.status_code == 304
+
+
+def test_concurrent_misses_build_once():
+    cache = ResponseCache()
+    calls = 0
+
+    async def build():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"n": calls}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.respond(make_request(), "k", 10, build) for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+    assert calls == 1
+    assert {r.body for r in responses} == {b'{"n":1}'}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_build():
+    cache = ResponseCache()
+
+    async def build():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def scenario():
+        first = asyncio.create_task(cache.respond(make_request(), "k", 10, build))
+        second = asyncio.create_task(cache.respond(make_request(), "k", 10, build))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()).body == b'{"ok":true}'
+
+
+def test_failed_build_is_not_cached():
+    cache = ResponseCache()
+
+    async def build():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        try:
+            await cache.respond(make_request(), "k", 10, build)
+        except RuntimeError:
+            pass
+        return cache.get("k", 10)
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,106 @@
+import pytest
+
+import wire_format
+from wire_format import BinarySession, decode_frame
+
+
+def update(market_id, prices, question="Who wins?"):
+    return {
+        "market_id": market_id,
+        "question": question,
+        "prices": {
+            outcome: {"token_id": token_id, "probability": probability}
+            for outcome, (token_id, probability) in prices.items()
+        }
+    }
+
+
+def test_round_trip_defines_slots_once():
+    session = BinarySession()
+    session.queue_update(update("m1", {"Lakers": ("t1", 0.42), "Celtics": ("t2", 0.58)}))
+
+    frames = session.flush()
+    assert len(frames) == 1
+    _, records = decode_frame(frames[0])
+    assert records[0] == ("market", 0, "m1", "Who wins?")
+    assert ("token", 0, 0, "t1", "Lakers") in records
+    assert ("token", 1, 0, "t2", "Celtics") in records
+    assert ("price", 0, 0.42) in records
+    assert ("price", 1, 0.58) in records
+
+    # Known slots are referenced by number only
+    session.queue_update(update("m1", {"Lakers": ("t1", 0.45)}))
+    _, records = decode_frame(session.flush()[0])
+    assert records == [("price", 0, 0.45)]
+    assert session.flush() == []
+
+
+def test_later_update_in_same_tick_wins():
+    session = BinarySession()
+    session.queue_update(update("m1", {"Yes": ("t1", 0.3)}))
+    session.queue_update(update("m1", {"Yes": ("t1", 0.35)}))
+    _, records = decode_frame(session.flush()[0])
+    assert [r for r in records if r[0] == "price"] == [("price", 0, 0.35)]
+
+
+def test_oldest_fetched_at_is_reset_by_flush():
+    session = BinarySession()
+    session.queue_update(update("m1", {"Yes": ("t1", 0.3)}), fetched_at=20.0)
+    session.queue_update(update("m2", {"Yes": ("t2", 0.3)}), fetched_at=10.0)
+    assert session.oldest_fetched_at == 10.0
+    session.flush()
+    assert session.oldest_fetched_at is None
+
+
+def test_slot_exhaustion_raises(monkeypatch):
+    monkeypatch.setattr(wire_format, "MAX_SLOTS", 2)
+    session = BinarySession()
+    session.queue_update(update("m1", {"Yes": ("t1", 0.5), "No": ("t2", 0.5)}))
+    with pytest.raises(ValueError, match="token slots exhausted"):
+        session.queue_update(update("m2", {"Yes": ("t3", 0.5)}))
+
+
+def test_large_batch_is_split_into_frames(monkeypatch):
+    monkeypatch.setattr(wire_format, "MAX_RECORDS", 4)
+    session = BinarySession()
+    for i in range(3):
+        session.queue_update(update(f"m{i}", {"Yes": (f"t{i}", 0.5)}))
+
+    frames = session.flush()
+    decoded = [decode_frame(frame)[1] for frame in frames]
+    assert [len(records) for records in decoded] == [4, 4, 1]
+    flat = [record for records in decoded for record in records]
+    # Definitions go out before any price that refers to them
+    first_price = next(i for i, record in enumerate(flat) if record[0] == "price")
+    assert all(record[0] == "price" for record in flat[first_price:])
+    assert len(flat) == 9
+
+
+def test_released_slots_are_dropped_and_reused(monkeypatch):
+    monkeypatch.setattr(wire_format, "MAX_SLOTS", 2)
+    session = BinarySession()
+    session.queue_update(update("m1", {"Yes": ("t1", 0.5), "No": ("t2", 0.5)}))
+    session.flush()
+
+    # A queued price for a released market is not sent
+    session.queue_update(update("m1", {"Yes": ("t1", 0.6)}))
+    session.release_market("m1")
+    _, records = decode_frame(session.flush()[0])
+    assert records == [("drop", 0)]
+
+    # Slots are free again, so a full table does not exhaust the session
+    session.queue_update(update("m2", {"Yes": ("t3", 0.7), "No": ("t4", 0.3)}))
+    _, records = decode_frame(session.flush()[0])
+    assert records[0] == ("market", 0, "m2", "Who wins?")
+    assert {r[1] for r in records if r[0] == "token"} == {0, 1}
+    assert session.token_slots.keys() == {"t3", "t4"}
+
+
+def test_release_and_redefine_in_one_tick_keeps_order():
+    session = BinarySession()
+    session.queue_update(update("m1", {"Yes": ("t1", 0.5)}))
+    session.flush()
+    session.release_market("m1")
+    session.queue_update(update("m2", {"Yes": ("t2", 0.4)}))
+    _, records = decode_frame(session.flush()[0])
+    assert records == [("drop", 0), ("market", 0, "m2", "Who wins?"), ("token", 0, 0, "t2", "Yes"), ("price", 0, 0.4)]
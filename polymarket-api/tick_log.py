@@ -0,0 +1,84 @@
+"""
+Tick recording and streaming for offline replay
+
+The server appends every price it sees (poller mids, top of book, venue
+odds, resolutions) to an NDJSON log when TICK_LOG_PATH is set. Each line is
+one tick:
+
+    {"ts": 1760000000.1, "source": "poly", "market_id": "...", "token_id": "...", "mid": 0.45}
+    {"ts": 1760000000.2, "source": "book", "token_id": "...", "ask": 0.46, "ask_size": 120.0}
+    {"ts": 1760000000.3, "source": "venue", "token_id": "...", "venue_odds": 2.1}
+    {"ts": 1760000050.0, "source": "resolved", "market_id": "...", "winner": "<token_id>"}
+
+read_ticks() streams one or more logs back in timestamp order without
+loading them into memory.
+"""
+
+import heapq
+import json
+import time
+from typing import Dict, Iterator, List, Optional
+
+
+class TickRecorder:
+    def __init__(self, path: str, flush_every: int = 500):
+        self.file = open(path, "a", buffering=1 << 16)
+        self.flush_every = flush_every
+        self._since_flush = 0
+
+    def _write(self, tick: Dict):
+        self.file.write(json.dumps(tick, separators=(",", ":")))
+        self.file.write("\n")
+        self._since_flush += 1
+        if self._since_flush >= self.flush_every:
+            self.file.flush()
+            self._since_flush = 0
+
+    def record_update(self, update: Dict, ts: Optional[float] = None):
+        """Record a poller price update ({market_id, prices})"""
+        ts = ts or time.time()
+        for price_data in update.get("prices", {}).values():
+            if price_data.get("token_id") and price_data.get("probability") is not None:
+                self._write({
+                    "ts": ts,
+                    "source": "poly",
+                    "market_id": update["market_id"],
+                    "token_id": price_data["token_id"],
+                    "mid": price_data["probability"]
+                })
+
+    def record_book(self, token_id: str, ask: Optional[float], ask_size: Optional[float],
+                    bid: Optional[float] = None, ts: Optional[float] = None):
+        self._write({
+            "ts": ts or time.time(),
+            "source": "book",
+            "token_id": token_id,
+            "bid": bid,
+            "ask": ask,
+            "ask_size": ask_size
+        })
+
+    def record_venue(self, token_id: str, odds: float, ts: Optional[float] = None):
+        self._write({"ts": ts or time.time(), "source": "venue", "token_id": token_id, "venue_odds": odds})
+
+    def record_resolution(self, market_id: str, winner: Optional[str], ts: Optional[float] = None):
+        self._write({"ts": ts or time.time(), "source": "resolved", "market_id": market_id, "winner": winner})
+
+    def close(self):
+        self.file.flush()
+        self.file.close()
+
+
+def _read_file(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_ticks(paths: List[str]) -> Iterator[Dict]:
+    """Stream ticks from several logs merged by timestamp (each log must be time-ordered)"""
+    if len(paths) == 1:
+        return _read_file(paths[0])
+    return heapq.merge(*(_read_file(p) for p in paths), key=lambda tick: tick["ts"])
@@ -0,0 +1,340 @@
+"""
+Local stand-in for the Gamma, CLOB and market-channel WebSocket APIs
+
+Serves a generated or recorded dataset with configurable latency and jitter
+so the client, poller and API server can be benchmarked offline.
+
+    python upstream_stub.py serve [--fixture data.json] [--port 9000] [--latency 0.05] [--jitter 0.02]
+    python upstream_stub.py record data.json [--pages 5]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+
+TEAMS = [
+    "Lakers", "Celtics", "Warriors", "Bulls", "Heat", "Knicks", "Nuggets",
+    "Suns", "Bucks", "Mavericks", "Liverpool", "Arsenal", "Chelsea",
+    "Real Madrid", "Barcelona", "Bayern", "Chiefs", "Eagles", "Cowboys", "Packers"
+]
+
+SPORTS_TAGS = [
+    {"id": "1", "label": "Sports", "slug": "sports"},
+    {"id": "745", "label": "NBA", "slug": "nba"},
+    {"id": "450", "label": "NFL", "slug": "nfl"},
+    {"id": "100350", "label": "Soccer", "slug": "soccer"},
+    {"id": "864", "label": "Tennis", "slug": "tennis"}
+]
+
+
+def generate_dataset(events: int = 100, markets_per_event: int = 2, seed: int = 1) -> Dict:
+    """Build a synthetic dataset shaped like Gamma /events plus CLOB books"""
+    rng = random.Random(seed)
+    dataset = {"tags": SPORTS_TAGS, "events": [], "midpoints": {}}
+    market_id = 600000
+
+    for e in range(events):
+        home, away = rng.sample(TEAMS, 2)
+        date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        tag = rng.choice(SPORTS_TAGS[1:])
+        event = {
+            "id": str(30000 + e),
+            "slug": f"{home}-vs-{away}-{date}".lower().replace(" ", "-"),
+            "title": f"{home} vs. {away}",
+            "image": f"https://example.invalid/{home.lower()}.png",
+            "tags": [SPORTS_TAGS[0], tag],
+            "markets": []
+        }
+
+        for m in range(markets_per_event):
+            market_id += 1
+            tokens = []
+            mid = rng.uniform(0.05, 0.95)
+            for outcome, price in (("Yes", mid), ("No", 1 - mid)):
+                token_id = str(rng.getrandbits(250))
+                tokens.append({"token_id": token_id, "outcome": outcome, "price": round(price, 3)})
+                dataset["midpoints"][token_id] = price
+
+            event["markets"].append({
+                "id": str(market_id),
+                "question": f"Will the {home} beat the {away}?" if m == 0 else f"{home} vs. {away}: O/U {200 + m}.5",
+                "description": f"Resolves Yes if the {home} win against the {away} on {date}.",
+                "tokens": tokens,
+                "volume": f"{rng.uniform(1e3, 1e6):.2f}",
+                "liquidity": f"{rng.uniform(1e3, 1e5):.2f}",
+                "end_date_iso": f"{date}T23:59:00Z",
+                "tags": ["Sports", tag["label"]],
+                "active": True,
+                "closed": False
+            })
+
+        dataset["events"].append(event)
+
+    return dataset
+
+
+class UpstreamStub:
+    def __init__(self, dataset: Dict, latency: float = 0.0, jitter: float = 0.0,
+                 ws_interval: float = 0.5, seed: int = 1):
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.ws_interval = ws_interval
+        self.rng = random.Random(seed)
+
+        self.markets: Dict[str, Dict] = {}
+        for event in dataset["events"]:
+            for market in event.get("markets", []):
+                self.markets[str(market["id"])] = market
+        self.midpoints: Dict[str, float] = dict(dataset.get("midpoints", {}))
+
+        # token_id -> wall time the last price for it was served
+        self.served_at: Dict[str, float] = {}
+        self.request_count = 0
+
+        self.runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    async def _delay(self):
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _tick(self, token_id: str) -> float:
+        """Random-walk a token's midpoint and record when it was served"""
+        mid = self.midpoints.get(token_id, 0.5)
+        mid = min(0.99, max(0.01, mid + self.rng.uniform(-0.005, 0.005)))
+        self.midpoints[token_id] = mid
+        self.served_at[token_id] = time.time()
+        return mid
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.request_count += 1
+        if request.path != "/ws/market":
+            await self._delay()
+        return await handler(request)
+
+    # Gamma
+
+    async def events(self, request: web.Request) -> web.Response:
+        limit = int(request.query.get("limit", 20))
+        offset = int(request.query.get("offset", 0))
+        tag_slug = request.query.get("tag_slug")
+        slug = request.query.get("slug")
+
+        events = self.dataset["events"]
+        if tag_slug:
+            events = [e for e in events if any(t.get("slug") == tag_slug for t in e.get("tags", []))]
+        if slug:
+            events = [e for e in events if e.get("slug") == slug]
+
+        return web.json_response(events[offset:offset + limit])
+
+    async def list_markets(self, request: web.Request) -> web.Response:
+        limit = int(request.query.get("limit", 100))
+        offset = int(request.query.get("offset", 0))
+        return web.json_response(list(self.markets.values())[offset:offset + limit])
+
+    async def get_market(self, request: web.Request) -> web.Response:
+        market = self.markets.get(request.match_info["market_id"])
+        if market is None:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response(market)
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response(self.dataset.get("tags", []))
+
+    # CLOB
+
+    async def midpoint(self, request: web.Request) -> web.Response:
+        token_id = request.query.get("token_id", "")
+        if token_id not in self.midpoints:
+            return web.json_response({"error": "No orderbook exists for the requested token id"}, status=404)
+        return web.json_response({"mid": f"{self._tick(token_id):.4f}"})
+
+    async def price(self, request: web.Request) -> web.Response:
+        token_id = request.query.get("token_id", "")
+        if token_id not in self.midpoints:
+            return web.json_response({"error": "No orderbook exists for the requested token id"}, status=404)
+        return web.json_response({"price": f"{self._tick(token_id) + 0.005:.4f}"})
+
+    def _book(self, token_id: str) -> Dict:
+        mid = self._tick(token_id)
+        levels = 10
+        return {
+            "market": token_id,
+            "asset_id": token_id,
+            "timestamp": str(int(time.time() * 1000)),
+            "bids": [
+                {"price": f"{max(0.01, mid - 0.01 * (i + 1)):.2f}", "size": f"{self.rng.uniform(10, 5000):.2f}"}
+                for i in range(levels)
+            ],
+            "asks": [
+                {"price": f"{min(0.99, mid + 0.01 * (i + 1)):.2f}", "size": f"{self.rng.uniform(10, 5000):.2f}"}
+                for i in range(levels)
+            ]
+        }
+
+    async def book(self, request: web.Request) -> web.Response:
+        token_id = request.query.get("token_id", "")
+        if token_id not in self.midpoints:
+            return web.json_response({"error": "No orderbook exists for the requested token id"}, status=404)
+        return web.json_response(self._book(token_id))
+
+    # Market channel WebSocket
+
+    async def ws_market(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribed: List[str] = []
+
+        async def pump():
+            while not ws.closed:
+                await asyncio.sleep(self.ws_interval)
+                for token_id in list(subscribed):
+                    await ws.send_json({
+                        "type": "price_change",
+                        "asset_id": token_id,
+                        "price": f"{self._tick(token_id):.4f}",
+                        "timestamp": time.time()
+                    })
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                tokens = data.get("markets") or data.get("assets_ids") or []
+                if data.get("type") == "subscribe":
+                    subscribed.extend(t for t in tokens if t not in subscribed)
+                elif data.get("type") == "unsubscribe":
+                    subscribed[:] = [t for t in subscribed if t not in tokens]
+        finally:
+            pump_task.cancel()
+        return ws
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/events", self.events)
+        app.router.add_get("/markets", self.list_markets)
+        app.router.add_get("/markets/{market_id}", self.get_market)
+        app.router.add_get("/tags", self.tags)
+        app.router.add_get("/midpoint", self.midpoint)
+        app.router.add_get("/price", self.price)
+        app.router.add_get("/book", self.book)
+        app.router.add_get("/ws/market", self.ws_market)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the base URL (port 0 picks a free port)"""
+        self.runner = web.AppRunner(self.build_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    @property
+    def ws_url(self) -> str:
+        return self.base_url.replace("http://", "ws://") + "/ws/market"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+async def record(path: str, pages: int = 5, page_size: int = 50):
+    """Record live Gamma sports events and CLOB midpoints into a fixture file"""
+    import httpx
+    from config import config
+
+    dataset = {"tags": [], "events": [], "midpoints": {}}
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        resp = await client.get(f"{config.GAMMA_API_URL}/tags")
+        dataset["tags"] = resp.json() if resp.status_code == 200 else SPORTS_TAGS
+
+        for page in range(pages):
+            resp = await client.get(
+                f"{config.GAMMA_API_URL}/events",
+                params={"limit": page_size, "offset": page * page_size,
+                        "tag_slug": "sports", "active": "true", "closed": "false"}
+            )
+            events = resp.json() if resp.status_code == 200 else []
+            if not events:
+                break
+            dataset["events"].extend(events)
+
+        token_ids = [
+            token["token_id"]
+            for event in dataset["events"]
+            for market in event.get("markets", [])
+            for token in market.get("tokens", [])
+            if token.get("token_id")
+        ]
+
+        semaphore = asyncio.Semaphore(16)
+
+        async def fetch_mid(token_id: str):
+            async with semaphore:
+                resp = await client.get(f"{config.POLYMARKET_HOST}/midpoint", params={"token_id": token_id})
+                if resp.status_code == 200:
+                    dataset["midpoints"][token_id] = float(resp.json().get("mid", 0.5))
+
+        await asyncio.gather(*(fetch_mid(t) for t in token_ids))
+
+    with open(path, "w") as f:
+        json.dump(dataset, f)
+    print(f"Recorded {len(dataset['events'])} events, {len(dataset['midpoints'])} tokens to {path}")
+
+
+def load_dataset(path: Optional[str], events: int = 100) -> Dict:
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    return generate_dataset(events)
+
+
+async def serve(args):
+    stub = UpstreamStub(load_dataset(args.fixture, args.events), args.latency, args.jitter, args.ws_interval)
+    url = await stub.start(args.host, args.port)
+    print(f"[Stub] Serving {len(stub.markets)} markets at {url} (ws: {stub.ws_url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve")
+    serve_parser.add_argument("--fixture")
+    serve_parser.add_argument("--events", type=int, default=100)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=9000)
+    serve_parser.add_argument("--latency", type=float, default=0.05)
+    serve_parser.add_argument("--jitter", type=float, default=0.02)
+    serve_parser.add_argument("--ws-interval", type=float, default=0.5)
+
+    record_parser = sub.add_parser("record")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--pages", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        asyncio.run(serve(args))
+    else:
+        asyncio.run(record(args.path, args.pages))
+
+
+if __name__ == "__main__":
+    main()
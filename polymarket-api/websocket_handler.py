@@ -4,9 +4,12 @@ WebSocket handler for real-time Polymarket updates
 
 import asyncio
 import json
+import time
 from typing import Dict, Set, Callable, Optional
 import websockets
 from config import config
+from metrics import poll_cycle_seconds, poll_lag_seconds
+from models import Market
 
 
 class PolymarketWebSocket:
@@ -120,47 +123,81 @@ class PolymarketWebSocket:
 class LiveOddsPoller:
     def __init__(self, client):
         self.client = client
-        self.tracked_markets: Dict[str, Dict] = {}
+        self.tracked_markets: Dict[str, Market] = {}
+        # token_id -> market_id for every tracked market
+        self.token_index: Dict[str, str] = {}
         self.callbacks: Dict[str, Callable] = {}
         self.running = False
-        self.poll_interval = 5  # seconds
+        self.poll_interval = config.POLL_INTERVAL  # seconds
     
-    def track_market(self, market_id: str, market_data: Dict):
+    def track_market(self, market_id: str, market_data: Market):
         """Add a market to track"""
         self.tracked_markets[market_id] = market_data
+        for token_id in market_data.token_ids():
+            self.token_index[token_id] = market_id
     
     def untrack_market(self, market_id: str):
         """Remove a market from tracking"""
-        self.tracked_markets.pop(market_id, None)
+        market = self.tracked_markets.pop(market_id, None)
+        if market is None:
+            return
+        for token_id in market.token_ids():
+            if self.token_index.get(token_id) == market_id:
+                del self.token_index[token_id]
+        if "untrack" in self.callbacks:
+            self.callbacks["untrack"](market_id, market)
     
     def on_update(self, callback: Callable):
         """Register callback for updates"""
         self.callbacks["update"] = callback
     
+    def on_untrack(self, callback: Callable):
+        """Register callback(market_id, market) for markets that stop being tracked"""
+        self.callbacks["untrack"] = callback
+    
+    async def poll_once(self):
+        """Fetch prices for every tracked market once and fire callbacks"""
+        for market_id, market_data in list(self.tracked_markets.items()):
+            prices = await self.client.get_prices_for_market(market_data)
+            
+            if prices and "update" in self.callbacks:
+                update_data = {
+                    "market_id": market_id,
+                    "question": market_data.question,
+                    "prices": prices,
+                    "timestamp": asyncio.get_event_loop().time(),
+                    # When the oldest of these prices left upstream, for staleness at send
+                    "fetched_at": self.client.prices_fetched_at(market_data.token_ids())
+                }
+                await self.callbacks["update"](update_data)
+    
     async def start_polling(self):
         """Start polling for price updates"""
         self.running = True
         print(f"[Poller] Started polling every {self.poll_interval}s")
         
+        # Cycles are scheduled at a fixed rate; lag is how late a cycle starts
+        next_due = time.monotonic()
+        overrun = 0.0
+        
         while self.running:
+            start = time.monotonic()
+            poll_lag_seconds.set(max(0.0, start - next_due) + overrun)
             try:
-                for market_id, market_data in list(self.tracked_markets.items()):
-                    prices = await self.client.get_prices_for_market(market_data)
-                    
-                    if prices and "update" in self.callbacks:
-                        update_data = {
-                            "market_id": market_id,
-                            "question": market_data.get("question", ""),
-                            "prices": prices,
-                            "timestamp": asyncio.get_event_loop().time()
-                        }
-                        await self.callbacks["update"](update_data)
-                
-                await asyncio.sleep(self.poll_interval)
-                
+                await self.poll_once()
             except Exception as e:
                 print(f"[Poller] Error: {e}")
-                await asyncio.sleep(self.poll_interval)
+            
+            finished = time.monotonic()
+            poll_cycle_seconds.observe(finished - start)
+            
+            # If a cycle overran, start the next one now instead of bursting to
+            # catch up. The overrun is measured against the original slot first,
+            # so lag still shows how far behind the poller is
+            due = next_due + self.poll_interval
+            overrun = max(0.0, finished - due)
+            next_due = max(due, finished)
+            await asyncio.sleep(next_due - finished)
     
     def stop_polling(self):
         """Stop polling"""
@@ -0,0 +1,236 @@
+"""
+Compact binary wire format for /ws clients
+
+Clients opt in by sending {"type": "hello", "format": "binary"} (or by
+connecting to /ws?format=binary). Price updates are then batched per flush
+tick into a single binary frame instead of one JSON message per market.
+
+Frame layout (little-endian):
+
+    header   <BBHd   version, frame kind, record count, server timestamp
+    records  each starts with a u8 record type
+
+    MARKET_DEF  <BHHH  type, market slot, id length, question length
+                       followed by the utf-8 market id and question
+    TOKEN_DEF   <BHHHH type, token slot, market slot, token id length,
+                       outcome length, followed by the utf-8 token id and outcome
+    PRICE       <BHI   type, token slot, probability * PRICE_SCALE
+    MARKET_DROP <BH    type, market slot
+
+Market and token slots are small integers assigned per session. A slot is
+defined once (MARKET_DEF / TOKEN_DEF) in the first frame that uses it and
+is referenced by number from then on. When the server stops tracking a
+market it sends MARKET_DROP: the client forgets the market slot and its
+token slots, and the server may reuse them in later definitions. Records
+are applied in order. A frame holds at most MAX_RECORDS
+records (the count is a u16); a larger batch goes out as several frames,
+definitions first.
+"""
+
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+WIRE_VERSION = 1
+FRAME_BATCH = 1
+
+RECORD_MARKET_DEF = 1
+RECORD_TOKEN_DEF = 2
+RECORD_PRICE = 3
+RECORD_MARKET_DROP = 4
+
+# Prices go out as fixed-point integers: probability * PRICE_SCALE
+PRICE_SCALE = 1_000_000
+
+MAX_SLOTS = 0xFFFF
+MAX_RECORDS = 0xFFFF
+
+_HEADER = struct.Struct("<BBHd")
+_MARKET_DEF = struct.Struct("<BHHH")
+_TOKEN_DEF = struct.Struct("<BHHHH")
+_PRICE = struct.Struct("<BHI")
+_MARKET_DROP = struct.Struct("<BH")
+
+
+def encode_price(probability: float) -> int:
+    """Convert a probability to its fixed-point wire value"""
+    value = int(round(probability * PRICE_SCALE))
+    return min(max(value, 0), 0xFFFFFFFF)
+
+
+class BinarySession:
+    """Per-connection slot table and pending update buffer"""
+
+    def __init__(self):
+        self.market_slots: Dict[str, int] = {}
+        self.token_slots: Dict[str, int] = {}
+        self._pending_defs: List[bytes] = []
+        # token slot -> latest fixed-point price; later updates in the same
+        # tick overwrite earlier ones so a frame never carries stale prices
+        self._pending_prices: Dict[int, int] = {}
+        # market slot -> its token ids, so dropping a market frees its tokens
+        self._market_tokens: Dict[int, List[str]] = {}
+        self._free_market_slots: List[int] = []
+        self._free_token_slots: List[int] = []
+        self._next_market_slot = 0
+        self._next_token_slot = 0
+        # Monotonic upstream fetch time of the oldest price waiting to be sent
+        self.oldest_fetched_at: Optional[float] = None
+
+    def _market_slot(self, market_id: str, question: str) -> int:
+        slot = self.market_slots.get(market_id)
+        if slot is not None:
+            return slot
+
+        if self._free_market_slots:
+            slot = self._free_market_slots.pop()
+        else:
+            slot = self._next_market_slot
+            if slot >= MAX_SLOTS:
+                raise ValueError("Binary session market slots exhausted")
+            self._next_market_slot += 1
+        self.market_slots[market_id] = slot
+        self._market_tokens[slot] = []
+
+        id_bytes = market_id.encode("utf-8")
+        question_bytes = question.encode("utf-8")[:0xFFFF]
+        self._pending_defs.append(
+            _MARKET_DEF.pack(RECORD_MARKET_DEF, slot, len(id_bytes), len(question_bytes))
+            + id_bytes + question_bytes
+        )
+        return slot
+
+    def _token_slot(self, token_id: str, market_slot: int, outcome: str) -> int:
+        slot = self.token_slots.get(token_id)
+        if slot is not None:
+            return slot
+
+        if self._free_token_slots:
+            slot = self._free_token_slots.pop()
+        else:
+            slot = self._next_token_slot
+            if slot >= MAX_SLOTS:
+                raise ValueError("Binary session token slots exhausted")
+            self._next_token_slot += 1
+        self.token_slots[token_id] = slot
+        self._market_tokens[market_slot].append(token_id)
+
+        id_bytes = token_id.encode("utf-8")
+        outcome_bytes = outcome.encode("utf-8")
+        self._pending_defs.append(
+            _TOKEN_DEF.pack(RECORD_TOKEN_DEF, slot, market_slot, len(id_bytes), len(outcome_bytes))
+            + id_bytes + outcome_bytes
+        )
+        return slot
+
+    def queue_update(self, data: Dict, fetched_at: Optional[float] = None):
+        """Buffer a poller price update ({market_id, question, prices}) for the next flush"""
+        market_id = data.get("market_id")
+        if not market_id:
+            return
+
+        if fetched_at is not None and (self.oldest_fetched_at is None or fetched_at < self.oldest_fetched_at):
+            self.oldest_fetched_at = fetched_at
+
+        market_slot = self._market_slot(market_id, data.get("question", ""))
+
+        for outcome, price_data in (data.get("prices") or {}).items():
+            token_id = price_data.get("token_id")
+            probability = price_data.get("probability")
+            if not token_id or probability is None:
+                continue
+
+            token_slot = self._token_slot(token_id, market_slot, outcome)
+            self._pending_prices[token_slot] = encode_price(probability)
+
+    def release_market(self, market_id: str):
+        """Free a market's slots and queue a MARKET_DROP; its unsent prices are discarded"""
+        slot = self.market_slots.pop(market_id, None)
+        if slot is None:
+            return
+
+        for token_id in self._market_tokens.pop(slot, []):
+            token_slot = self.token_slots.pop(token_id)
+            self._pending_prices.pop(token_slot, None)
+            self._free_token_slots.append(token_slot)
+        self._free_market_slots.append(slot)
+        self._pending_defs.append(_MARKET_DROP.pack(RECORD_MARKET_DROP, slot))
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending_prices) + len(self._pending_defs)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending_prices or self._pending_defs)
+
+    def flush(self) -> List[bytes]:
+        """Encode everything queued since the last flush into as few frames as fit"""
+        if not self.has_pending:
+            return []
+
+        records = self._pending_defs
+        records.extend(
+            _PRICE.pack(RECORD_PRICE, slot, value)
+            for slot, value in self._pending_prices.items()
+        )
+
+        self._pending_defs = []
+        self._pending_prices = {}
+        self.oldest_fetched_at = None
+
+        now = time.time()
+        frames = []
+        for i in range(0, len(records), MAX_RECORDS):
+            chunk = records[i:i + MAX_RECORDS]
+            frames.append(_HEADER.pack(WIRE_VERSION, FRAME_BATCH, len(chunk), now) + b"".join(chunk))
+        return frames
+
+
+def decode_frame(frame: bytes) -> Tuple[float, List[Tuple]]:
+    """
+    Decode a frame into (timestamp, records). Reference implementation for
+    clients and tooling; the server never decodes its own frames.
+    """
+    version, kind, count, timestamp = _HEADER.unpack_from(frame, 0)
+    if version != WIRE_VERSION or kind != FRAME_BATCH:
+        raise ValueError(f"Unsupported frame version={version} kind={kind}")
+
+    offset = _HEADER.size
+    records = []
+
+    for _ in range(count):
+        record_type = frame[offset]
+
+        if record_type == RECORD_MARKET_DEF:
+            _, slot, id_len, question_len = _MARKET_DEF.unpack_from(frame, offset)
+            offset += _MARKET_DEF.size
+            market_id = frame[offset:offset + id_len].decode("utf-8")
+            offset += id_len
+            question = frame[offset:offset + question_len].decode("utf-8", errors="replace")
+            offset += question_len
+            records.append(("market", slot, market_id, question))
+
+        elif record_type == RECORD_TOKEN_DEF:
+            _, slot, market_slot, id_len, outcome_len = _TOKEN_DEF.unpack_from(frame, offset)
+            offset += _TOKEN_DEF.size
+            token_id = frame[offset:offset + id_len].decode("utf-8")
+            offset += id_len
+            outcome = frame[offset:offset + outcome_len].decode("utf-8")
+            offset += outcome_len
+            records.append(("token", slot, market_slot, token_id, outcome))
+
+        elif record_type == RECORD_PRICE:
+            _, slot, value = _PRICE.unpack_from(frame, offset)
+            offset += _PRICE.size
+            records.append(("price", slot, value / PRICE_SCALE))
+
+        elif record_type == RECORD_MARKET_DROP:
+            _, slot = _MARKET_DROP.unpack_from(frame, offset)
+            offset += _MARKET_DROP.size
+            records.append(("drop", slot))
+
+        else:
+            raise ValueError(f"Unknown record type {record_type}")
+
+    return timestamp, records